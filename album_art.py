@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Album art loading shared by all visualizer runtimes
+Downloads, resizes and caches album art as ready-to-display frames
+"""
+
+import io
+from PIL import Image
+from http_client import get_client
+import metrics
+from panel_layout import LAYOUT
+
+MATRIX_SIZE = LAYOUT.art_size
+
+
+def pick_image_url(images, size=MATRIX_SIZE):
+    """URL of the smallest image variant at least size x size pixels
+
+    Spotify lists 640, 300 and 64 pixel variants; a 32x32 matrix only needs
+    the 64 pixel one. Falls back to the largest variant if none is big enough.
+    """
+    if not images:
+        return None
+    sized = [img for img in images if img.get('width') and img.get('height')]
+    if not sized:
+        return images[0]['url']
+    big_enough = [img for img in sized if img['width'] >= size and img['height'] >= size]
+    if big_enough:
+        return min(big_enough, key=lambda img: img['width'] * img['height'])['url']
+    return max(sized, key=lambda img: img['width'] * img['height'])['url']
+
+
+def process_image_bytes(data, size=MATRIX_SIZE):
+    """Decode downloaded image bytes into a size x size RGB frame"""
+    with metrics.timer('decode_resize'):
+        image = Image.open(io.BytesIO(data))
+
+        # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding, so
+        # full resolution pixels are never materialized (no-op for other formats)
+        image.draft('RGB', (size, size))
+
+        # Convert to RGB if needed
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Resize to matrix size
+        return image.resize((size, size), Image.Resampling.LANCZOS)
+
+
+def download_image(image_url):
+    """Download raw image bytes, or None on failure"""
+    with metrics.timer('image_download'):
+        response = get_client().get(image_url, kind='image')
+    if response.status_code == 200:
+        return response.content
+    print(f"Image download failed: {response.status_code}")
+    return None
+
+
+def load_album_art(cache, album_id, image_url, size=MATRIX_SIZE, remember=True):
+    """Return the processed frame for an album, from cache when possible
+
+    remember=False stores a newly downloaded frame on disk only, so bulk
+    loading doesn't push the frames in use out of the memory tier.
+    """
+    key = cache.key_for(album_id, image_url, size)
+    image = cache.get(key)
+    if image is not None:
+        return image
+
+    try:
+        data = download_image(image_url)
+        if data is None:
+            return None
+        image = process_image_bytes(data, size)
+    except Exception as e:
+        print(f"Error processing image: {e}")
+        return None
+
+    return cache.put(key, image, memory=remember)
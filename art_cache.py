@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Two-tier album art cache
+In-memory LRU of ready-to-display frames in front of an on-disk store of
+processed frames, so repeat albums never touch the network. Each frame's
+palette (see palette.py) is computed once when it is stored and kept in the
+same file, and comes back attached to the frame as image.info['palette']
+"""
+
+import os
+import struct
+import tempfile
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image
+from palette import Palette, extract_palette, PALETTE_SIZE
+
+# Configuration
+CACHE_DIR = os.environ.get('ART_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.art_cache'))
+MEMORY_ITEMS = 64                  # frames kept decoded in RAM
+DISK_LIMIT_BYTES = 16 * 1024 * 1024  # on-disk budget (~5000 32x32 frames)
+
+# File layout: magic, width, height, crc32 of everything after the header,
+# palette colors, raw RGB bytes, then r, g, b, share per palette color
+HEADER = struct.Struct('<4sHHIB')
+MAGIC = b'SVF2'
+# Frames written before palettes: no palette count, pixels only
+HEADER_V1 = struct.Struct('<4sHHI')
+MAGIC_V1 = b'SVF1'
+
+
+class ArtCache:
+    """Processed album art frames keyed by album id or image URL"""
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_items=MEMORY_ITEMS, disk_limit=DISK_LIMIT_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk_bytes = 0
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'corrupt': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+        }
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.disk_bytes = sum(size for _, _, size in self._disk_entries())
+        except OSError as e:
+            print(f"Art cache directory unavailable ({e}) - using memory only")
+            self.cache_dir = None
+
+    @staticmethod
+    def key_for(album_id, image_url, size):
+        """Cache key for a frame: album id when known, otherwise the image URL"""
+        return f"{album_id or image_url}@{size}"
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + '.frame')
+
+    def _disk_entries(self):
+        """(mtime, path, size) for every frame file on disk"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.frame'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def get(self, key):
+        """Return the cached frame for key, or None on a miss"""
+        with self.lock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return image
+
+        image = self._read_disk(key)
+        with self.lock:
+            self.stats['misses' if image is None else 'disk_hits'] += 1
+        if image is not None:
+            self._remember(key, image)
+        return image
+
+    def contains(self, key):
+        """Whether key is cached in either tier, without loading it or counting a hit"""
+        with self.lock:
+            if key in self.memory:
+                return True
+        return bool(self.cache_dir) and os.path.exists(self._path(key))
+
+    def put(self, key, image, memory=True):
+        """Store a processed frame in both tiers (memory=False: disk only, e.g. bulk pre-warming)
+
+        Returns the stored frame, with its palette attached.
+        """
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if 'palette' not in image.info:
+            image.info['palette'] = extract_palette(image)
+        if memory:
+            self._remember(key, image)
+        self._write_disk(key, image)
+        return image
+
+    def capacity(self, size):
+        """Roughly how many size x size frames fit in the disk budget"""
+        return self.disk_limit // (HEADER.size + size * size * 3 + 4 * PALETTE_SIZE)
+
+    def _remember(self, key, image):
+        with self.lock:
+            self.memory[key] = image
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+                self.stats['memory_evictions'] += 1
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        upgrade = False
+        try:
+            if data[:4] == MAGIC_V1:
+                magic, width, height, crc = HEADER_V1.unpack_from(data)
+                body, colors = data[HEADER_V1.size:], 0
+                upgrade = True
+            else:
+                magic, width, height, crc, colors = HEADER.unpack_from(data)
+                body = data[HEADER.size:]
+            frame_bytes = width * height * 3
+            if magic not in (MAGIC, MAGIC_V1) or len(body) != frame_bytes + 4 * colors or zlib.crc32(body) != crc:
+                raise ValueError("bad frame file")
+            image = Image.frombytes('RGB', (width, height), body[:frame_bytes])
+            if colors:
+                image.info['palette'] = Palette.from_bytes(body[frame_bytes:])
+        except (struct.error, ValueError):
+            # Corrupt entry - drop it and treat as a miss
+            removed = self._remove(path)
+            with self.lock:
+                self.stats['corrupt'] += 1
+                if removed:
+                    self.disk_bytes -= len(data)
+            return None
+
+        if upgrade:
+            # Older frame without a palette: work it out once and keep it
+            image.info['palette'] = extract_palette(image)
+            self._write_disk(key, image)
+            return image
+        try:
+            os.utime(path)  # mtime doubles as the disk LRU clock
+        except OSError:
+            pass
+        return image
+
+    def _write_disk(self, key, image):
+        if not self.cache_dir:
+            return
+        palette = image.info['palette']
+        body = image.tobytes() + palette.to_bytes()
+        data = HEADER.pack(MAGIC, image.width, image.height, zlib.crc32(body), len(palette)) + body
+        path = self._path(key)
+        tmp_path = None
+        try:
+            # Unique per writer: art workers, prefetch and prewarm can store the same key at once
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            with self.lock:
+                # Replace and account together, so concurrent writers of a key count it once
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(tmp_path, path)
+                self.disk_bytes += len(data) - old_size
+                over_budget = self.disk_bytes > self.disk_limit
+        except OSError as e:
+            print(f"Could not write art cache entry: {e}")
+            if tmp_path:
+                self._remove(tmp_path)
+            return
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used frame files until under budget"""
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries:
+            if total <= self.disk_limit:
+                break
+            if self._remove(path):
+                total -= size
+                evicted += 1
+        with self.lock:
+            self.disk_bytes = total
+            self.stats['disk_evictions'] += evicted
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def summary(self):
+        """Human readable hit/miss summary"""
+        s = self.stats
+        return (f"{s['memory_hits']} memory hits, {s['disk_hits']} disk hits, "
+                f"{s['misses']} misses, {s['corrupt']} corrupt, "
+                f"{len(self.memory)} frames in memory, {self.disk_bytes // 1024} KiB on disk")
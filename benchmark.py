@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the visualizer runtimes
+Runs each runtime against the local fake Spotify server on the simulated
+matrix and reports track-change-to-pixels latency, bytes downloaded,
+request rate and CPU time
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+from PIL import Image, ImageChops
+from fake_spotify import FakeSpotifyServer, make_playlist
+from sim_matrix import read_recording
+from instant_on import FrameSnapshot
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIMES = ['spotify_visualizer.py', 'simple_spotify2.py', 'simple_spotify.py']
+COLOR_TOLERANCE = 12  # per-pixel difference still counted as the album color
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile, None for an empty list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def color_share(image, color):
+    """Fraction of pixels within tolerance of color"""
+    diff = ImageChops.difference(image, Image.new('RGB', image.size, color)).convert('L')
+    near = diff.point(lambda v: 255 if v <= COLOR_TOLERANCE else 0).histogram()[255]
+    return near / float(image.width * image.height)
+
+
+def change_latencies(changes, frames):
+    """Seconds from each album change to the first and the complete frame showing it"""
+    first, full = [], []
+    startup = None
+    previous_album = None
+    for index, (changed_at, track) in enumerate(changes):
+        if track['album_id'] == previous_album:
+            continue
+        previous_album = track['album_id']
+        seen = done = None
+        for timestamp, image in frames:
+            if timestamp < changed_at:
+                continue
+            share = color_share(image, track['color'])
+            if seen is None and share >= 0.01:
+                seen = timestamp - changed_at
+            if share >= 0.99:
+                done = timestamp - changed_at
+                break
+        if index == 0:
+            startup = done  # includes process start and the first download
+            continue
+        if seen is not None:
+            first.append(seen)
+        if done is not None:
+            full.append(done)
+    return startup, first, full
+
+
+def wait_with_rusage(proc, timeout):
+    """Wait for a child and return its resource usage (kills it after timeout)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return usage
+        if time.monotonic() > deadline:
+            proc.kill()
+            deadline = float('inf')
+        time.sleep(0.05)
+
+
+def run_runtime(script, args):
+    """Drive one runtime against a fresh fake server; returns a result dict"""
+    playlist = make_playlist(args.tracks, args.albums, args.track_seconds)
+    server = FakeSpotifyServer(playlist, latency=args.latency, image_latency=args.image_latency,
+                               expire_every=args.expire_every, rate_limit_every=args.rate_limit_every,
+                               retry_after=args.retry_after).start()
+    workdir = tempfile.mkdtemp(prefix='visualizer-bench-')
+    tokens_path = os.path.join(workdir, 'tokens.json')
+    record_path = os.path.join(workdir, 'frames.bin')
+    log_path = os.path.join(workdir, 'runtime.log')
+    with open(tokens_path, 'w') as f:
+        json.dump(server.initial_tokens(), f)
+    if args.snapshot:
+        # A last frame from a previous run, so the instant-on path is measured
+        FrameSnapshot(os.path.join(workdir, '.last_frame')).save(32, 32, bytes([40]) * 32 * 32 * 3)
+
+    env = dict(os.environ)
+    env.update({
+        'SPOTIFY_API_BASE': server.base_url,
+        'SPOTIFY_ACCOUNTS_BASE': server.base_url,
+        'SPOTIFY_TOKENS_FILE': tokens_path,
+        'ART_CACHE_DIR': os.path.join(workdir, 'art_cache'),
+        'SIM_MATRIX': '1',
+        'SIM_MATRIX_RECORD': record_path,
+        'COLOR_GAIN': '1',  # keep album colors recognizable on the recorded frames
+        'PROGRESS_BAR': '0',  # overlays would keep frames from matching the album color
+        'TRACK_TITLE': '0',
+        'PYTHONUNBUFFERED': '1',
+    })
+
+    with open(log_path, 'w') as log:
+        started = time.monotonic()
+        proc = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, script)], cwd=workdir,
+                                env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        time.sleep(args.duration)
+        ended = time.monotonic()
+        proc.send_signal(signal.SIGINT)
+        usage = wait_with_rusage(proc, timeout=5)
+    server.stop()
+
+    frames = list(read_recording(record_path)) if os.path.exists(record_path) else []
+    startup, first, full = change_latencies(server.track_changes(ended), frames)
+    minutes = (ended - started) / 60.0
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        'runtime': script,
+        'seconds': ended - started,
+        'frames': len(frames),
+        'first_pixel': frames[0][0] - started if frames else None,
+        'startup': startup,
+        'first_p50': percentile(first, 50), 'first_p95': percentile(first, 95),
+        'full_p50': percentile(full, 50), 'full_p95': percentile(full, 95),
+        'changes': len(full),
+        'requests_per_min': server.stats['requests'] / minutes,
+        'polls_per_min': server.stats['polls'] / minutes,
+        'api_kib': server.stats['api_bytes'] / 1024.0,
+        'image_kib': server.stats['image_bytes'] / 1024.0,
+        'unauthorized': server.stats['unauthorized'],
+        'rate_limited': server.stats['rate_limited'],
+        'cpu_seconds': cpu,
+        'cpu_per_hour': cpu / (ended - started) * 3600,
+        'log': log_path,
+    }
+
+
+def fmt(value, unit='', digits=2):
+    return '-' if value is None else f"{value:.{digits}f}{unit}"
+
+
+def print_report(results):
+    print()
+    print(f"{'runtime':<24}{'pixel':>8}{'start':>8}{'first p50/p95':>16}{'full p50/p95':>16}"
+          f"{'req/min':>9}{'img KiB':>9}{'401':>5}{'429':>5}{'CPU s/h':>9}")
+    for r in results:
+        print(f"{r['runtime']:<24}{fmt(r['first_pixel'], 's'):>8}{fmt(r['startup'], 's'):>8}"
+              f"{fmt(r['first_p50']) + '/' + fmt(r['first_p95']):>16}"
+              f"{fmt(r['full_p50']) + '/' + fmt(r['full_p95']):>16}"
+              f"{r['requests_per_min']:>9.1f}{r['image_kib']:>9.1f}"
+              f"{r['unauthorized']:>5}{r['rate_limited']:>5}{r['cpu_per_hour']:>9.1f}")
+    print("\nPixel is seconds from process start to the first frame on the panel, start to the first album art.")
+    print("Latencies are seconds from a scripted album change to the first / complete frame showing it.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the visualizer runtimes against a fake Spotify")
+    parser.add_argument('runtimes', nargs='*', default=RUNTIMES, help="scripts to benchmark")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds to run each runtime")
+    parser.add_argument('--tracks', type=int, default=8)
+    parser.add_argument('--albums', type=int, default=4)
+    parser.add_argument('--track-seconds', type=float, default=8.0)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to API calls")
+    parser.add_argument('--image-latency', type=float, default=0.15, help="seconds added to image downloads")
+    parser.add_argument('--expire-every', type=float, default=20.0, help="invalidate tokens every N seconds (0 = never)")
+    parser.add_argument('--rate-limit-every', type=int, default=40, help="429 every Nth API request (0 = never)")
+    parser.add_argument('--retry-after', type=int, default=2)
+    parser.add_argument('--snapshot', action='store_true', help="start from a saved last frame (instant-on)")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for script in args.runtimes:
+        print(f"Benchmarking {script} for {args.duration:.0f}s...")
+        result = run_runtime(script, args)
+        print(f"  {result['frames']} frames, {result['changes']} album changes measured, log: {result['log']}")
+        results.append(result)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Color processing for frames headed to the matrix
+Gain, per-channel gamma, white balance and brightness are folded into one
+lookup table at startup and applied to whole frames with Image.point
+"""
+
+import os
+import metrics
+
+
+def _triple(value):
+    """Accept a single number or an (r, g, b) sequence"""
+    if isinstance(value, (int, float)):
+        return (float(value),) * 3
+    r, g, b = value
+    return (float(r), float(g), float(b))
+
+
+def _env_value(name, default):
+    """Read a number or an 'r,g,b' triple from the environment"""
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    parts = [float(p) for p in raw.split(',')]
+    return parts[0] if len(parts) == 1 else tuple(parts)
+
+
+class ColorPipeline:
+    """Precomputed per-channel color lookup table"""
+
+    def __init__(self, gain=1.0, gamma=1.0, white_balance=1.0, brightness=1.0):
+        self.gain = float(gain)
+        self.gamma = _triple(gamma)
+        self.white_balance = _triple(white_balance)
+        self.brightness = float(brightness)
+        self.lut = self._build_lut()
+        self.is_identity = self.lut == list(range(256)) * 3
+
+    @classmethod
+    def from_env(cls, gain=1.0, gamma=1.0, white_balance=1.0, brightness=1.0):
+        """Build a pipeline from COLOR_* environment overrides and script defaults"""
+        return cls(
+            gain=_env_value('COLOR_GAIN', gain),
+            gamma=_env_value('COLOR_GAMMA', gamma),
+            white_balance=_env_value('COLOR_WHITE_BALANCE', white_balance),
+            brightness=_env_value('COLOR_BRIGHTNESS', brightness),
+        )
+
+    def _build_lut(self):
+        lut = []
+        for channel in range(3):
+            gamma = self.gamma[channel]
+            scale = self.gain * self.white_balance[channel] * self.brightness
+            for v in range(256):
+                out = ((v / 255.0) ** gamma) * scale * 255.0
+                lut.append(min(255, max(0, int(out + 0.5))))
+        return lut
+
+    def apply(self, image):
+        """Color-correct a whole RGB frame in one pass"""
+        if self.is_identity:
+            return image
+        with metrics.timer('color'):
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            return image.point(self.lut)
+
+    def map_rgb(self, r, g, b):
+        """Color-correct a single color (for fills)"""
+        lut = self.lut
+        return lut[r], lut[256 + g], lut[512 + b]
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Temporal dithering for panels running at low pwm_bits
+rpi-rgb-led-matrix maps each 8-bit value through CIE1931 luminance into 11
+bit planes and only shows the top pwm_bits of them, so gradients band. For
+every input value the two neighbouring displayable levels and the share of
+time to spend on the upper one are precomputed; each new frame becomes a
+short set of canvases that are cycled on vsync, so the average brightness
+has more depth than the hardware PWM
+"""
+
+import os
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+# Configuration
+DITHER_FRAMES = int(os.environ.get('DITHER_FRAMES', '4'))  # canvases per dither cycle
+DITHER_RATE = float(os.environ.get('DITHER_RATE', '240'))  # max canvas swaps per second
+BIT_PLANES = 11  # rpi-rgb-led-matrix internal precision
+
+# Ordered offsets so neighbouring pixels flip in different phases
+BAYER_4X4 = np.array([[0, 8, 2, 10], [12, 4, 14, 6], [3, 11, 1, 9], [15, 7, 13, 5]])
+
+
+def dither_enabled():
+    return os.environ.get('MATRIX_DITHER') == '1'
+
+
+def _cie1931(c, brightness):
+    """The library's luminance mapping of an 8-bit value into BIT_PLANES bits"""
+    v = c * brightness / 255.0
+    return ((1 << BIT_PLANES) - 1) * (v / 902.3 if v <= 8 else ((v + 16) / 116.0) ** 3)
+
+
+class TemporalDither:
+    """Per-value lookup tables: low input, high input, frames on the high one"""
+
+    def __init__(self, pwm_bits=6, brightness=100, frames=DITHER_FRAMES):
+        self.pwm_bits = pwm_bits
+        self.brightness = brightness
+        self.frames = max(1, frames)
+        shift = BIT_PLANES - pwm_bits
+        target = [_cie1931(c, brightness) / (1 << shift) for c in range(256)]
+        shown = [int(round(_cie1931(c, brightness))) >> shift for c in range(256)]
+
+        low = list(range(256))
+        high = list(range(256))
+        on = [0] * 256
+        for c in range(256):
+            # Smallest input the hardware shows one level brighter
+            nxt = next((d for d in range(c + 1, 256) if shown[d] > shown[c]), None)
+            if nxt is None:
+                continue
+            share = (target[c] - shown[c]) / float(shown[nxt] - shown[c])
+            high[c] = nxt
+            on[c] = min(self.frames, max(0, int(round(share * self.frames))))
+
+        self.low = np.array(low, dtype=np.uint8)
+        self.high = np.array(high, dtype=np.uint8)
+        self.on = np.array(on, dtype=np.uint8)
+        self.is_identity = self.frames == 1 or pwm_bits >= BIT_PLANES or not any(on)
+        self.offsets = {}
+
+    @classmethod
+    def for_matrix(cls, matrix, frames=DITHER_FRAMES):
+        """Match the PWM depth and brightness the matrix was set up with"""
+        return cls(getattr(matrix, 'pwmBits', 11), getattr(matrix, 'brightness', 100), frames)
+
+    def _offset(self, width, height):
+        key = (width, height)
+        if key not in self.offsets:
+            tiled = np.tile(BAYER_4X4, (height // 4 + 1, width // 4 + 1))[:height, :width]
+            self.offsets[key] = (tiled * self.frames // 16)[:, :, None].astype(np.uint8)
+        return self.offsets[key]
+
+    def frames_for(self, image):
+        """The canvases to cycle for one frame (a single image if nothing needs dithering)"""
+        if self.is_identity:
+            return [image]
+        pixels = np.asarray(image, dtype=np.uint8)
+        on = self.on[pixels]
+        if not on.any():
+            return [image]
+        low, high = self.low[pixels], self.high[pixels]
+        offset = self._offset(image.width, image.height)
+        result = []
+        for phase in range(self.frames):
+            upper = (offset + phase) % self.frames < on
+            result.append(Image.fromarray(np.where(upper, high, low), 'RGB'))
+        return result
+
+
+class DitherPresenter:
+    """Cycles the precomputed canvases of the current frame on vsync"""
+
+    def __init__(self, matrix, dither, rate=DITHER_RATE):
+        self.matrix = matrix
+        self.dither = dither
+        self.interval = 1.0 / rate
+        # One spare so a new set never overwrites the canvas being shown
+        self.pool = [matrix.CreateFrameCanvas() for _ in range(dither.frames + 1)]
+        self.front = None
+        self.active = []
+        self.index = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stats = {'frames': 0, 'swaps': 0, 'patches': 0}
+        threading.Thread(target=self._cycle, name='dither', daemon=True).start()
+
+    def present(self, image):
+        """Precompute the dither set for image and show its first phase now"""
+        frames = self.dither.frames_for(image)
+        with self.lock:
+            canvases = [canvas for canvas in self.pool if canvas is not self.front][:len(frames)]
+            for canvas, frame in zip(canvases, frames):
+                canvas.SetImage(frame)
+            self.active = canvases
+            self.index = 0
+            self._swap_next()
+            self.stats['frames'] += 1
+        self.wakeup.set()
+
+    def patch(self, pixels):
+        """Rewrite pixels [(x, y, r, g, b)] in every canvas of the current set
+
+        Each canvas gets the pixel's value for its own phase, so the cycle
+        carries on undisturbed. False when the set can't hold them (nothing
+        shown yet, or a single canvas and a pixel that needs dithering).
+        """
+        dither = self.dither
+        with self.lock:
+            canvases = self.active
+            if not canvases:
+                return False
+            if len(canvases) < dither.frames and any(dither.on[v] for _, _, *rgb in pixels for v in rgb):
+                return False
+            offsets = dither._offset(canvases[0].width, canvases[0].height)
+            for x, y, *rgb in pixels:
+                offset = int(offsets[y, x, 0])
+                for phase, canvas in enumerate(canvases):
+                    upper = (offset + phase) % dither.frames
+                    r, g, b = (int(dither.high[v] if upper < dither.on[v] else dither.low[v]) for v in rgb)
+                    canvas.SetPixel(x, y, r, g, b)
+            self.stats['patches'] += 1
+        return True
+
+    def _swap_next(self):
+        canvas = self.active[self.index % len(self.active)]
+        self.index += 1
+        self.matrix.SwapOnVSync(canvas)
+        self.front = canvas
+        self.stats['swaps'] += 1
+
+    def _cycle(self):
+        while True:
+            if len(self.active) < 2:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            started = time.monotonic()
+            with self.lock:
+                if len(self.active) >= 2:
+                    self._swap_next()
+            # SwapOnVSync already paces real hardware; this caps simulated ones
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
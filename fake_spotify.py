@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for api.spotify.com, accounts.spotify.com and the image CDN
+Plays a scripted playlist in real time and can inject latency, 401s and 429s,
+so the visualizer runtimes can be driven and measured without Spotify
+"""
+
+import io
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from PIL import Image
+
+# Distinct solid colors so the benchmark can tell albums apart on the matrix
+ALBUM_COLORS = [
+    (230, 40, 40), (40, 200, 60), (40, 80, 230), (240, 200, 30),
+    (200, 40, 220), (30, 210, 220), (250, 130, 20), (140, 90, 40),
+]
+IMAGE_SIZES = (640, 300, 64)
+
+
+def make_playlist(tracks=8, albums=4, duration=8.0):
+    """Scripted playlist cycling through a few albums (so caching matters)"""
+    playlist = []
+    for i in range(tracks):
+        album = i % albums
+        playlist.append({
+            'id': f'track{i}',
+            'name': f'Track {i}',
+            'artist': f'Artist {album}',
+            'album_id': f'album{album}',
+            'color': ALBUM_COLORS[album % len(ALBUM_COLORS)],
+            'duration': duration,
+        })
+    return playlist
+
+
+def make_library(playlist, extra_albums=0, tracks_per_album=3):
+    """Playlists for the library endpoints: the scripted one plus one of albums it never plays"""
+    albums = len({track['album_id'] for track in playlist})
+    extra = []
+    for album in range(albums, albums + extra_albums):
+        for i in range(tracks_per_album):
+            extra.append({
+                'id': f'track{album}-{i}',
+                'name': f'Track {album}-{i}',
+                'artist': f'Artist {album}',
+                'album_id': f'album{album}',
+                'color': ALBUM_COLORS[album % len(ALBUM_COLORS)],
+                'duration': 180.0,
+            })
+    library = {'playlist0': playlist}
+    if extra:
+        library['playlist1'] = extra
+    return library
+
+
+class FakeSpotifyServer:
+    """Threaded HTTP server emulating the endpoints the visualizer uses"""
+
+    def __init__(self, playlist=None, port=0, latency=0.0, image_latency=0.0,
+                 expire_every=0.0, rate_limit_every=0, retry_after=2, token_lifetime=3600,
+                 library=None):
+        self.playlist = playlist or make_playlist()
+        self.library = library or make_library(self.playlist)  # playlist id -> tracks
+        self.latency = latency
+        self.image_latency = image_latency
+        self.expire_every = expire_every          # seconds between forced token expiries
+        self.rate_limit_every = rate_limit_every  # every Nth API request gets a 429
+        self.retry_after = retry_after
+        self.token_lifetime = token_lifetime
+        self.lock = threading.Lock()
+        self.started_at = None  # playback clock starts at the first poll
+        self.playing = True     # False answers polls with 204 No Content, like an idle account
+        self.token_serial = 0
+        self.valid_tokens = {'token-0'}
+        self.last_expiry = time.monotonic()
+        self.api_requests = 0
+        self.images = {}
+        self.stats = {
+            'requests': 0, 'polls': 0, 'queue': 0, 'token': 0, 'images': 0, 'library': 0,
+            'not_modified': 0, 'unauthorized': 0, 'rate_limited': 0,
+            'api_bytes': 0, 'image_bytes': 0,
+        }
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.thread = None
+
+    # -- lifecycle
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-spotify', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def initial_tokens(self):
+        """Token file contents for a runtime that is already authorized"""
+        return {'access_token': 'token-0', 'refresh_token': 'refresh-0',
+                'expires_at': time.time() + self.token_lifetime}
+
+    # -- playback script
+
+    def cycle_length(self):
+        return sum(track['duration'] for track in self.playlist)
+
+    def position(self, now=None):
+        """(index, progress seconds) of the scripted playback at now"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.started_at is None:
+                self.started_at = now
+            elapsed = (now - self.started_at) % self.cycle_length()
+        for index, track in enumerate(self.playlist):
+            if elapsed < track['duration']:
+                return index, elapsed
+            elapsed -= track['duration']
+        return len(self.playlist) - 1, 0.0
+
+    def track_changes(self, until):
+        """(monotonic time, track) for every scripted track start up to until"""
+        if self.started_at is None:
+            return []
+        changes = []
+        t = self.started_at
+        index = 0
+        while t <= until:
+            track = self.playlist[index % len(self.playlist)]
+            changes.append((t, track))
+            t += track['duration']
+            index += 1
+        return changes
+
+    def album_json(self, album_id):
+        images = [{'url': f"{self.base_url}/image/{album_id}/{size}.jpg",
+                   'width': size, 'height': size} for size in IMAGE_SIZES]
+        return {'id': album_id, 'name': album_id, 'images': images}
+
+    def track_json(self, track):
+        return {
+            'id': track['id'],
+            'name': track['name'],
+            'duration_ms': int(track['duration'] * 1000),
+            'artists': [{'name': track['artist']}],
+            'album': self.album_json(track['album_id']),
+        }
+
+    def currently_playing(self):
+        index, progress = self.position()
+        return {
+            'is_playing': True,
+            'progress_ms': int(progress * 1000),
+            'item': self.track_json(self.playlist[index]),
+        }
+
+    def queue(self):
+        index, _ = self.position()
+        upcoming = [self.playlist[(index + i) % len(self.playlist)] for i in range(1, 4)]
+        return {
+            'currently_playing': self.track_json(self.playlist[index]),
+            'queue': [self.track_json(track) for track in upcoming],
+        }
+
+    # -- library
+
+    def library_tracks(self):
+        return [track for tracks in self.library.values() for track in tracks]
+
+    def page(self, path, items, query, max_limit=50):
+        """Spotify-style paging object for items, from the limit/offset query parameters"""
+        limit = min(int(query.get('limit', ['20'])[0]), max_limit)
+        offset = int(query.get('offset', ['0'])[0])
+        next_url = None
+        if offset + limit < len(items):
+            next_url = f"{self.base_url}{path}?offset={offset + limit}&limit={limit}"
+        return {'items': items[offset:offset + limit], 'total': len(items),
+                'limit': limit, 'offset': offset, 'next': next_url}
+
+    def library_response(self, path, query):
+        """(status, body) for the playlist / saved album / album batch endpoints, or None"""
+        if path == '/v1/me/playlists':
+            playlists = [{'id': pid, 'name': pid, 'tracks': {'total': len(tracks)}}
+                         for pid, tracks in self.library.items()]
+            return 200, self.page(path, playlists, query)
+        if path.startswith('/v1/playlists/') and path.endswith('/tracks'):
+            tracks = self.library.get(path.split('/')[3])
+            if tracks is None:
+                return 404, {'error': {'status': 404, 'message': 'Not found'}}
+            return 200, self.page(path, [{'track': self.track_json(track)} for track in tracks], query, 100)
+        if path == '/v1/me/albums':
+            album_ids = sorted({track['album_id'] for track in self.playlist})
+            return 200, self.page(path, [{'album': self.album_json(a)} for a in album_ids], query)
+        if path == '/v1/albums':
+            ids = [i for i in query.get('ids', [''])[0].split(',') if i]
+            if not ids or len(ids) > 20:
+                return 400, {'error': {'status': 400, 'message': 'Too many ids requested'}}
+            known = {track['album_id'] for track in self.library_tracks()}
+            return 200, {'albums': [self.album_json(a) if a in known else None for a in ids]}
+        return None
+
+    def image_bytes(self, album_id, size):
+        key = (album_id, size)
+        if key not in self.images:
+            track = next((t for t in self.library_tracks() if t['album_id'] == album_id), None)
+            color = track['color'] if track else (128, 128, 128)
+            buffer = io.BytesIO()
+            Image.new('RGB', (size, size), color).save(buffer, 'JPEG', quality=90)
+            self.images[key] = buffer.getvalue()
+        return self.images[key]
+
+    # -- auth and fault injection
+
+    def check_token(self, header):
+        now = time.monotonic()
+        with self.lock:
+            if self.expire_every and now - self.last_expiry >= self.expire_every:
+                self.valid_tokens.clear()
+                self.last_expiry = now
+            token = (header or '').replace('Bearer ', '', 1)
+            return token in self.valid_tokens
+
+    def issue_token(self):
+        with self.lock:
+            self.token_serial += 1
+            token = f'token-{self.token_serial}'
+            self.valid_tokens.add(token)
+        return {'access_token': token, 'token_type': 'Bearer',
+                'expires_in': self.token_lifetime, 'refresh_token': f'refresh-{self.token_serial}'}
+
+    def should_rate_limit(self):
+        with self.lock:
+            self.api_requests += 1
+            return self.rate_limit_every and self.api_requests % self.rate_limit_every == 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+            def send_body(self, status, body=b'', content_type='application/json', headers=None, kind='api'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.stats[f'{kind}_bytes'] += len(body)
+
+            def send_json(self, data, etag=True):
+                body = json.dumps(data).encode('utf-8')
+                headers = {}
+                if etag:
+                    tag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                    if self.headers.get('If-None-Match') == tag:
+                        server.stats['not_modified'] += 1
+                        self.send_body(304, headers={'ETag': tag})
+                        return
+                    headers['ETag'] = tag
+                self.send_body(200, body, headers=headers)
+
+            def do_GET(self):
+                server.stats['requests'] += 1
+                path = urlparse(self.path).path
+
+                if path.startswith('/image/'):
+                    if server.image_latency:
+                        time.sleep(server.image_latency)
+                    try:
+                        _, _, album_id, name = path.split('/')
+                        size = int(name.split('.')[0])
+                    except ValueError:
+                        self.send_body(404, kind='image')
+                        return
+                    server.stats['images'] += 1
+                    self.send_body(200, server.image_bytes(album_id, size), 'image/jpeg', kind='image')
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.should_rate_limit():
+                    server.stats['rate_limited'] += 1
+                    self.send_body(429, headers={'Retry-After': str(server.retry_after)})
+                    return
+                if not server.check_token(self.headers.get('Authorization')):
+                    server.stats['unauthorized'] += 1
+                    self.send_body(401, b'{"error": {"status": 401, "message": "The access token expired"}}')
+                    return
+
+                if path == '/v1/me/player/currently-playing':
+                    server.stats['polls'] += 1
+                    if server.playing:
+                        self.send_json(server.currently_playing())
+                    else:
+                        self.send_body(204)
+                elif path == '/v1/me/player/queue':
+                    server.stats['queue'] += 1
+                    self.send_json(server.queue())
+                else:
+                    result = server.library_response(path, parse_qs(urlparse(self.path).query))
+                    if result is None:
+                        self.send_body(404)
+                        return
+                    server.stats['library'] += 1
+                    status, data = result
+                    self.send_body(status, json.dumps(data).encode('utf-8'))
+
+            def do_POST(self):
+                server.stats['requests'] += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                if server.latency:
+                    time.sleep(server.latency)
+                if urlparse(self.path).path != '/api/token' or 'grant_type' not in form:
+                    self.send_body(400, b'{"error": "invalid_request"}')
+                    return
+                server.stats['token'] += 1
+                self.send_json(server.issue_token(), etag=False)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Spotify API + image CDN")
+    parser.add_argument('--port', type=int, default=8899)
+    parser.add_argument('--tracks', type=int, default=8)
+    parser.add_argument('--albums', type=int, default=4)
+    parser.add_argument('--track-seconds', type=float, default=30.0)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to API calls")
+    parser.add_argument('--image-latency', type=float, default=0.0, help="seconds added to image downloads")
+    parser.add_argument('--expire-every', type=float, default=0.0, help="invalidate tokens every N seconds")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="429 every Nth API request")
+    parser.add_argument('--tokens-file', help="write a ready-to-use token file here")
+    parser.add_argument('--library-albums', type=int, default=0,
+                        help="extra albums in a second playlist, for prewarm.py")
+    args = parser.parse_args()
+
+    server = FakeSpotifyServer(make_playlist(args.tracks, args.albums, args.track_seconds), port=args.port,
+                               latency=args.latency, image_latency=args.image_latency,
+                               expire_every=args.expire_every, rate_limit_every=args.rate_limit_every)
+    server.library = make_library(server.playlist, args.library_albums)
+    if args.tokens_file:
+        with open(args.tokens_file, 'w') as f:
+            json.dump(server.initial_tokens(), f)
+
+    print(f"Fake Spotify listening on {server.base_url}")
+    print(f"  SPOTIFY_API_BASE={server.base_url} SPOTIFY_ACCOUNTS_BASE={server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n{server.stats}")
+        server.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Whole-frame output for the RGB matrix
+Renders into an offscreen canvas and swaps it in on vsync, so every frame
+is presented in a single call without tearing. Frames are drawn in logical
+coordinates and remapped onto the panel wiring by a PanelLayout. An
+optional overlay (e.g. progress_bar.ProgressBar, text.TrackTitle) is drawn over every frame
+and can be refreshed on its own by patching only the pixels it changed
+"""
+
+import threading
+from PIL import Image
+import metrics
+from dither import DitherPresenter
+
+
+class OverlayStack:
+    """Several overlays as one; later ones draw on top"""
+
+    def __init__(self, *overlays):
+        self.overlays = [overlay for overlay in overlays if overlay]
+
+    def pixels(self):
+        pixels = {}
+        for overlay in self.overlays:
+            pixels.update(overlay.pixels())
+        return pixels
+
+
+class FrameOutput:
+    """Double-buffered frame presentation on top of an RGBMatrix"""
+
+    def __init__(self, matrix, color=None, layout=None, dither=None, snapshot=None):
+        self.matrix = matrix
+        self.color = color  # optional ColorPipeline applied to every frame
+        self.layout = layout  # optional PanelLayout for rotated/chained panels
+        # Optional TemporalDither: frames become cycled canvas sets instead of one swap
+        self.presenter = DitherPresenter(matrix, dither) if dither and not dither.is_identity else None
+        self.snapshot = snapshot  # optional instant_on.FrameSnapshot of the last shown frame
+        self.lock = threading.Lock()
+        # The matrix owns the front buffer; this is the offscreen back buffer.
+        # SwapOnVSync hands back the old front buffer, so the pair just alternates.
+        self.canvas = matrix.CreateFrameCanvas()
+        if layout and not layout.is_identity:
+            self.width, self.height = layout.width, layout.height
+        else:
+            self.layout = None
+            self.width = self.canvas.width
+            self.height = self.canvas.height
+        self.current = None
+        self.frames = 0
+        self.listeners = []  # called with every presented image (before color correction)
+        self.overlay = None
+        self.overlay_hidden = False
+        self.base = None  # last logical frame without the overlay, None after fill/clear
+        self.base_serial = 0
+        self.shown_overlay = None  # overlay pixels on the panel right now
+        # (base serial, overlay pixels) drawn into each buffer, so refresh_overlay can patch
+        self.front_state = None
+        self.back_state = None
+        self.stats = {'overlay_patches': 0, 'overlay_pixels': 0, 'overlay_redraws': 0}
+
+    def add_listener(self, callback):
+        """Also hand each presented frame to callback(image), e.g. a FrameStream"""
+        self.listeners.append(callback)
+
+    def set_overlay(self, overlay):
+        """Draw overlay.pixels() -> {(x, y): (r, g, b, alpha)} over every frame"""
+        self.overlay = overlay
+
+    def hide_overlay(self, hidden=True):
+        """Keep the overlay off the panel (e.g. while idle); the next frame or refresh drops it"""
+        self.overlay_hidden = hidden
+
+    def _overlay_pixels(self):
+        if not self.overlay:
+            return None
+        return {} if self.overlay_hidden else self.overlay.pixels()
+
+    def _notify(self, image):
+        for callback in self.listeners:
+            try:
+                callback(image)
+            except Exception as e:
+                print(f"Frame listener failed: {e}")
+
+    def show(self, image, x=None, y=None):
+        """Blit a whole PIL image (centered unless x/y given) and present it on the next vsync"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        partial = image.size != (self.width, self.height)
+        if x is None:
+            x = (self.width - image.width) // 2
+        if y is None:
+            y = (self.height - image.height) // 2
+        if (partial or x or y) and (self.layout or self.listeners or self.snapshot or self.overlay):
+            # Compose the full logical frame so it can be remapped, streamed and overlaid
+            full = Image.new('RGB', (self.width, self.height))
+            full.paste(image, (x, y))
+            image, x, y, partial = full, 0, 0, False
+        overlay = self._overlay_pixels()
+        frame = self._draw_overlay(image, overlay) if overlay else image
+        frame = self.color.apply(frame) if self.color else frame
+        with self.lock, metrics.timer('present'):
+            if self.overlay:
+                self.base = image
+                self.base_serial += 1
+            if self.layout:
+                frame = self.layout.remap(frame)
+            if self.presenter:
+                if partial or x or y:
+                    full = Image.new('RGB', (self.canvas.width, self.canvas.height))
+                    full.paste(frame, (x, y))
+                    frame = full
+                self.presenter.present(frame)
+                self.frames += 1
+            else:
+                if partial or x or y:
+                    # Partial image - don't leave the previous back buffer showing around it
+                    self.canvas.Clear()
+                self.canvas.SetImage(frame, x, y)
+                self._swap(overlay)
+            self.shown_overlay = overlay
+            self.current = image
+            if self.snapshot:
+                self.snapshot.update(frame)
+        if self.listeners:
+            self._notify(image)
+
+    def fill(self, r, g, b):
+        """Present a solid color frame"""
+        rgb = (r, g, b)
+        if self.color:
+            r, g, b = self.color.map_rgb(r, g, b)
+        with self.lock:
+            if self.presenter:
+                self.presenter.present(Image.new('RGB', (self.canvas.width, self.canvas.height), (r, g, b)))
+                self.frames += 1
+            else:
+                self.canvas.Fill(r, g, b)
+                self._swap()
+            self._drop_base()
+            self.current = None
+        if self.listeners:
+            self._notify(Image.new('RGB', (self.width, self.height), rgb))
+
+    def clear(self):
+        """Present a black frame"""
+        with self.lock:
+            if self.presenter:
+                self.presenter.present(Image.new('RGB', (self.canvas.width, self.canvas.height)))
+                self.frames += 1
+            else:
+                self.canvas.Clear()
+                self._swap()
+            self._drop_base()
+            self.current = None
+        if self.listeners:
+            self._notify(Image.new('RGB', (self.width, self.height)))
+
+    def refresh_overlay(self):
+        """Repaint just the overlay pixels that changed; returns how many were painted"""
+        if not self.overlay or self.base is None:
+            return 0
+        overlay = self._overlay_pixels()
+        with self.lock:
+            base = self.base
+            if base is None or overlay == self.shown_overlay:
+                return 0
+            with metrics.timer('overlay'):
+                if self.presenter:
+                    # Every canvas of the dither set holds the frame on show: patch them all
+                    changed = self._changed(self.shown_overlay, overlay)
+                    patched = self.presenter.patch(list(self._patch_pixels(base, overlay, changed)))
+                else:
+                    back = self.back_state
+                    patched = bool(back) and back[0] == self.base_serial
+                    if patched:
+                        changed = self._changed(back[1], overlay)
+                        for x, y, r, g, b in self._patch_pixels(base, overlay, changed):
+                            self.canvas.SetPixel(x, y, r, g, b)
+                        self._swap(overlay)
+            if patched:
+                self.shown_overlay = overlay
+                self.stats['overlay_patches'] += 1
+                self.stats['overlay_pixels'] += len(changed)
+                return len(changed)
+
+            # The back buffer holds an older frame (or the dither set can't be patched): draw it whole
+            frame = self._draw_overlay(base, overlay)
+            if self.color:
+                frame = self.color.apply(frame)
+            if self.layout:
+                frame = self.layout.remap(frame)
+            if self.presenter:
+                self.presenter.present(frame)
+                self.frames += 1
+            else:
+                self.canvas.SetImage(frame)
+                self._swap(overlay)
+            self.shown_overlay = overlay
+            self.stats['overlay_redraws'] += 1
+            return len(overlay)
+
+    @staticmethod
+    def _changed(painted, overlay):
+        """Logical pixels where overlay differs from the painted overlay pixels"""
+        painted = painted or {}
+        changed = [xy for xy, rgba in overlay.items() if painted.get(xy) != rgba]
+        return changed + [xy for xy in painted if xy not in overlay]
+
+    def _patch_pixels(self, base, overlay, changed):
+        """(x, y, r, g, b) on the panel for each changed logical pixel"""
+        base_pixels = base.load()
+        for x, y in changed:
+            r, g, b = self._overlay_pixel(base_pixels, overlay, x, y)
+            if self.color:
+                r, g, b = self.color.map_rgb(r, g, b)
+            if self.layout:
+                x, y = self.layout.physical_xy(x, y)
+            yield x, y, r, g, b
+
+    @staticmethod
+    def _overlay_pixel(base_pixels, overlay, x, y):
+        """Base pixel (from Image.load()) with the overlay blended on top"""
+        rgba = overlay.get((x, y))
+        if rgba is None:
+            return base_pixels[x, y]
+        r, g, b, alpha = rgba
+        if alpha == 255:
+            return r, g, b
+        br, bg, bb = base_pixels[x, y]
+        return (br + (r - br) * alpha // 255, bg + (g - bg) * alpha // 255, bb + (b - bb) * alpha // 255)
+
+    def _draw_overlay(self, image, overlay):
+        frame = image.copy()
+        base_pixels, frame_pixels = image.load(), frame.load()
+        for x, y in overlay:
+            frame_pixels[x, y] = self._overlay_pixel(base_pixels, overlay, x, y)
+        return frame
+
+    def _drop_base(self):
+        """A fill or clear replaced the picture; the overlay waits for the next show()"""
+        self.base = None
+        self.base_serial += 1
+        self.shown_overlay = None
+
+    def _swap(self, overlay=None):
+        self.canvas = self.matrix.SwapOnVSync(self.canvas)
+        self.frames += 1
+        # The old front buffer comes back as the new back buffer, still holding
+        # its frame. Tracked by swap parity: the binding hands back a new
+        # FrameCanvas wrapper on every swap, so identity says nothing.
+        self.back_state = self.front_state
+        self.front_state = (self.base_serial, overlay)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Real-time renderer process for the two-process mode
+Owns the RGBMatrix (needs root) and does nothing but copy the newest frame
+from the shared-memory ring onto the panel. Run the visualizer separately,
+unprivileged, with MATRIX_RENDERER=shm
+"""
+
+import os
+import time
+import signal
+import argparse
+from PIL import Image
+from panel_layout import LAYOUT
+from shm_matrix import FrameRing, SHM_NAME
+from dither import TemporalDither, DitherPresenter
+
+try:
+    if os.environ.get('SIM_MATRIX') == '1':
+        raise ImportError("simulated matrix requested")
+    from rgbmatrix import RGBMatrix, RGBMatrixOptions
+except ImportError:
+    print("RGB Matrix library not available - rendering to the simulated matrix")
+    from sim_matrix import RGBMatrix, RGBMatrixOptions
+
+# Configuration
+POLL_INTERVAL = 0.004  # seconds between ring checks when no new frame is waiting
+
+
+def setup_matrix(args):
+    options = RGBMatrixOptions()
+    LAYOUT.apply_options(options)  # panel size, chain and parallel from MATRIX_*
+    options.hardware_mapping = args.hardware_mapping
+    options.gpio_slowdown = args.gpio_slowdown
+    options.brightness = args.brightness
+    options.pwm_bits = args.pwm_bits
+    options.pwm_lsb_nanoseconds = args.pwm_lsb_nanoseconds
+    options.limit_refresh_rate_hz = args.limit_refresh_rate_hz
+    return RGBMatrix(options=options)
+
+
+def run(matrix, ring, stop, presenter=None):
+    """Present every new frame from the ring until stop() is true"""
+    canvas = matrix.CreateFrameCanvas()
+    size = (ring.width, ring.height)
+    seq = ring.last_seq()
+    while not stop():
+        seq, pixels = ring.read_latest(seq)
+        if pixels is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        image = Image.frombuffer('RGB', size, pixels, 'raw', 'RGB', 0, 1)
+        if presenter:
+            presenter.present(image)
+            continue
+        canvas.SetImage(image)
+        canvas = matrix.SwapOnVSync(canvas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the LED matrix from the shared-memory frame ring")
+    parser.add_argument('--name', default=SHM_NAME, help="shared memory segment name")
+    parser.add_argument('--hardware-mapping', default='adafruit-hat')
+    parser.add_argument('--gpio-slowdown', type=int, default=4)
+    parser.add_argument('--brightness', type=int, default=100)
+    parser.add_argument('--pwm-bits', type=int, default=11)
+    parser.add_argument('--pwm-lsb-nanoseconds', type=int, default=130)
+    parser.add_argument('--limit-refresh-rate-hz', type=int, default=0)
+    parser.add_argument('--dither', action='store_true', help="temporal dithering (for low --pwm-bits)")
+    args = parser.parse_args()
+
+    # The ring first, while still root, so its permissions can be opened up;
+    # rpi-rgb-led-matrix drops privileges once the matrix is set up
+    ring = FrameRing.create(LAYOUT.physical_width, LAYOUT.physical_height, args.name)
+    matrix = setup_matrix(args)
+    print(f"🖼️  Renderer ready: {LAYOUT.describe()}, waiting for frames on {args.name}")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    try:
+        dither = TemporalDither(args.pwm_bits, args.brightness) if args.dither else None
+        presenter = DitherPresenter(matrix, dither) if dither and not dither.is_identity else None
+        run(matrix, ring, lambda: bool(stopping), presenter)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        matrix.Clear()
+        print(f"Renderer stopped: {ring.stats['read']} frames presented, {ring.stats['torn']} torn reads retried")
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events stream of the frames shown on the matrix
+The browser visualizer (index.html + script.js) subscribes to /frames and
+just paints what the Python side already fetched and processed, so one
+poller can feed any number of preview screens
+"""
+
+import os
+import json
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configuration
+FRAME_STREAM_ADDR = os.environ.get('FRAME_STREAM_ADDR', '0.0.0.0')
+FRAME_STREAM_PORT = int(os.environ.get('FRAME_STREAM_PORT', '8090'))  # 0 disables the stream
+KEEPALIVE = 15.0  # seconds between comment lines on an idle stream
+STATIC_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FILES = {
+    '/': ('index.html', 'text/html; charset=utf-8'),
+    '/index.html': ('index.html', 'text/html; charset=utf-8'),
+    '/script.js': ('script.js', 'application/javascript; charset=utf-8'),
+}
+
+
+class FrameStream:
+    """Latest frame plus a condition the client threads wait on"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pixels = None
+        self.event = None  # encoded SSE message for the latest frame
+        self.seq = 0
+        self.closed = False
+        self.stats = {'frames': 0, 'unchanged': 0, 'clients': 0}
+
+    def publish(self, image):
+        """FrameOutput listener: encode once, wake every subscriber"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        pixels = image.tobytes()
+        with self.condition:
+            if pixels == self.pixels:
+                self.stats['unchanged'] += 1
+                return
+            data = json.dumps({
+                'w': image.width,
+                'h': image.height,
+                'rgb': base64.b64encode(pixels).decode('ascii'),
+            })
+            self.pixels = pixels
+            self.seq += 1
+            self.event = f'id: {self.seq}\nevent: frame\ndata: {data}\n\n'.encode('utf-8')
+            self.stats['frames'] += 1
+            self.condition.notify_all()
+
+    def wait(self, seq, timeout=KEEPALIVE):
+        """Block until a frame newer than seq; returns (seq, event or None)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq != seq or self.closed, timeout)
+            if self.seq == seq:
+                return seq, None
+            return self.seq, self.event
+
+    def subscribe(self):
+        """Count a connected client (the counter is shared by every client thread)"""
+        with self.condition:
+            self.stats['clients'] += 1
+
+    def unsubscribe(self):
+        with self.condition:
+            self.stats['clients'] -= 1
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+def start_frame_stream(stream, port=FRAME_STREAM_PORT, addr=FRAME_STREAM_ADDR):
+    """Serve /frames (and the browser page) on a background thread; returns the server or None"""
+    if not port:
+        return None
+
+    class StreamHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/frames':
+                self.send_frames()
+            elif path in STATIC_FILES:
+                self.send_static(*STATIC_FILES[path])
+            else:
+                self.send_response(404)
+                self.end_headers()
+
+        def send_static(self, name, content_type):
+            try:
+                with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_frames(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            stream.subscribe()
+            seq = 0
+            try:
+                while not stream.closed:
+                    seq, event = stream.wait(seq)
+                    # Comment lines keep proxies and the browser from timing out
+                    self.wfile.write(event or b': keepalive\n\n')
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                stream.unsubscribe()
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((addr, port), StreamHandler)
+    except OSError as e:
+        print(f"⚠️  Frame stream not started on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='frame-stream', daemon=True).start()
+    print(f"🖥️  Browser preview on http://{addr}:{port}/")
+    return server
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for all Spotify and image CDN calls
+One pooled keep-alive session with per-endpoint timeouts, jittered retries
+and ETag revalidation, so steady-state polls reuse the same TLS connection
+"""
+
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configuration - base URLs can point at a local stand-in server for testing
+API_BASE = os.environ.get('SPOTIFY_API_BASE', 'https://api.spotify.com').rstrip('/')
+ACCOUNTS_BASE = os.environ.get('SPOTIFY_ACCOUNTS_BASE', 'https://accounts.spotify.com').rstrip('/')
+TOKEN_URL = f"{ACCOUNTS_BASE}/api/token"
+
+# (connect, read) timeouts per kind of endpoint, in seconds
+TIMEOUTS = {
+    'api': (3.05, 5),
+    'token': (3.05, 10),
+    'image': (3.05, 10),
+}
+RETRIES = 2            # extra attempts after the first one
+RETRY_BACKOFF = 0.5    # base delay, doubled per attempt and jittered
+RETRY_STATUSES = (500, 502, 503, 504)
+ETAG_ENTRIES = 32
+
+
+def api_url(path):
+    """Full Web API URL for a path like /v1/me/player/currently-playing"""
+    return f"{API_BASE}{path}"
+
+
+class HTTPClient:
+    """Pooled session with timeouts, retries and conditional GETs"""
+
+    def __init__(self, pool_size=4, retries=RETRIES, backoff=RETRY_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.etags = OrderedDict()  # url -> last 200 response carrying an ETag
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'not_modified': 0, 'bytes': 0}
+
+    def request(self, method, url, kind='api', retry=True, **kwargs):
+        """Send a request, retrying connection errors and 5xx with jittered backoff"""
+        kwargs.setdefault('timeout', TIMEOUTS.get(kind, TIMEOUTS['api']))
+        attempts = 1 + (self.retries if retry else 0)
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+            else:
+                with self.lock:
+                    self.stats['requests'] += 1
+                    self.stats['bytes'] += len(response.content)
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+            with self.lock:
+                self.stats['retries'] += 1
+            time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def get(self, url, kind='api', conditional=False, **kwargs):
+        """GET, optionally revalidating a previous response with If-None-Match"""
+        if not conditional:
+            return self.request('GET', url, kind=kind, **kwargs)
+
+        with self.lock:
+            cached = self.etags.get(url)
+        if cached is not None:
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers['If-None-Match'] = cached.headers['ETag']
+            kwargs['headers'] = headers
+
+        response = self.request('GET', url, kind=kind, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            # Unchanged - hand back the body we already have
+            with self.lock:
+                self.stats['not_modified'] += 1
+                self.etags.move_to_end(url)
+            return cached
+
+        if response.status_code == 200 and response.headers.get('ETag'):
+            with self.lock:
+                self.etags[url] = response
+                self.etags.move_to_end(url)
+                while len(self.etags) > ETAG_ENTRIES:
+                    self.etags.popitem(last=False)
+        return response
+
+    def post(self, url, kind='token', retry=False, **kwargs):
+        """POST - not retried by default since it may not be idempotent"""
+        return self.request('POST', url, kind=kind, retry=retry, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide shared HTTPClient"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
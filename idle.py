@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Low-power idle mode for when nothing is playing
+After a grace period without playback the art fades out through the
+transition engine and the panel is blanked (or dimmed); art that arrives
+while asleep is only remembered. The first poll that sees playback again
+wakes the panel straight away. Polling itself already backs off while idle
+(see polling.py). observe() only changes state; the fades are handed to
+defer(fn), which in the pipelined runtime runs them on the render thread
+"""
+
+import os
+import time
+import threading
+from PIL import Image
+from transitions import run_transition
+from album_art import pick_image_url
+from track_change import TrackChangeDetector
+
+# Configuration
+IDLE_GRACE = float(os.environ.get('IDLE_GRACE', '60'))  # seconds without playback before sleeping
+IDLE_MODE = os.environ.get('IDLE_MODE', 'blank')        # 'blank' or 'dim'
+IDLE_DIM_LEVEL = float(os.environ.get('IDLE_DIM_LEVEL', '0.15'))
+FADE_OUT = 2.0   # seconds
+FADE_IN = 0.4
+
+
+class IdleController:
+    """Tracks playback and owns what the panel shows while idle"""
+
+    def __init__(self, output, grace=IDLE_GRACE, mode=IDLE_MODE, dim_level=IDLE_DIM_LEVEL, defer=None):
+        self.output = output
+        # Where drawing happens: inline by default, e.g. VisualizerPipeline.call_on_render
+        self.defer = defer or (lambda fn: fn())
+        self.grace = grace
+        self.mode = mode
+        self.dim_level = dim_level
+        self.state = 'active'  # active -> grace -> asleep
+        self.idle_since = None
+        self.asleep_at = None
+        self.art = None       # latest art, shown or not
+        self.art_key = None
+        self.on_panel = None  # art currently lit on the panel, None when dark (drawing side only)
+        self.lock = threading.Lock()
+        self.stats = {'sleeps': 0, 'wakes': 0, 'suppressed': 0, 'asleep_seconds': 0}
+
+    @property
+    def asleep(self):
+        return self.state == 'asleep'
+
+    def show(self, image, key=None, present=None):
+        """Put art on the panel unless asleep; present(output, old, new) overrides output.show"""
+        with self.lock:
+            self.art, self.art_key = image, key
+            if self.asleep:
+                self.stats['suppressed'] += 1
+                return False
+        old, self.on_panel = self.on_panel, image
+        self.output.hide_overlay(False)
+        if present:
+            present(self.output, old, image)
+        else:
+            self.output.show(image)
+        return True
+
+    def observe(self, playing, key=None):
+        """Feed the outcome of every successful poll; key is the art key now playing"""
+        now = time.monotonic()
+        fade = None  # drawing to hand to defer once the state is settled
+        with self.lock:
+            if playing:
+                if self.asleep:
+                    fade = self._wake(now, key)
+                self.state = 'active'
+                self.idle_since = None
+            elif self.state == 'active':
+                self.state = 'grace'
+                self.idle_since = now
+            elif self.state == 'grace' and now - self.idle_since >= self.grace:
+                fade = self._sleep(now)
+            elif self.asleep:
+                self.stats['asleep_seconds'] += now - self.asleep_at
+                self.asleep_at = now
+        if fade:
+            self.defer(fade)
+
+    def observe_poll(self, scheduler, track_data, size):
+        """observe() from a PollScheduler that just saw track_data; errors and 429s don't count"""
+        if scheduler.state not in ('playing', 'idle'):
+            return
+        track = (track_data or {}).get('item')
+        images = track.get('album', {}).get('images', []) if track else []
+        key = TrackChangeDetector.art_key_for(track, pick_image_url(images, size)) if images else None
+        self.observe(scheduler.state == 'playing', key)
+
+    def _dimmed(self, image):
+        level = self.dim_level
+        return image.point(lambda v: int(v * level))
+
+    def _sleep(self, now):
+        dim = self.mode == 'dim' and self.on_panel is not None
+        print(f"💤 Nothing playing for {self.grace:.0f}s - {'dimming' if dim else 'blanking'} the panel")
+        self.state = 'asleep'
+        self.asleep_at = now
+        self.stats['sleeps'] += 1
+        return self._fade_out
+
+    def _fade_out(self):
+        """Drawing side of _sleep"""
+        with self.lock:
+            if not self.asleep:
+                return  # woke before the fade got its turn
+        lit, self.on_panel = self.on_panel, None  # dimmed art doesn't count as lit either
+        dim = self.mode == 'dim' and lit is not None
+        # No progress bar or title at full brightness over a dark panel
+        self.output.hide_overlay()
+        if lit is not None:
+            target = self._dimmed(lit) if dim else Image.new('RGB', lit.size)
+            run_transition(self.output, lit, target, 'crossfade', FADE_OUT)
+        if not dim:
+            self.output.clear()
+
+    def _wake(self, now, key):
+        print("⏰ Playback resumed - waking the panel")
+        self.stats['wakes'] += 1
+        self.stats['asleep_seconds'] += now - self.asleep_at
+        self.asleep_at = None
+        # Same art as before the sleep: fade it back in. Otherwise the new art
+        # is on its way through the normal path and fades in from black.
+        if self.art is not None and (key is None or key == self.art_key):
+            return self._fade_in
+        return None
+
+    def _fade_in(self):
+        """Drawing side of _wake"""
+        with self.lock:
+            art = self.art
+            if self.asleep or art is None or self.on_panel is not None:
+                return  # asleep again, or newer art already went up
+        start = self._dimmed(art) if self.mode == 'dim' else None
+        run_transition(self.output, start, art, 'crossfade', FADE_IN)
+        self.on_panel = art
+        self.output.hide_overlay(False)
+
+    def summary(self):
+        """Human readable idle counters"""
+        s = self.stats
+        return (f"{s['sleeps']} sleeps, {s['wakes']} wakes, {s['asleep_seconds']:.0f}s asleep, "
+                f"{s['suppressed']} frames held back")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Instant-on startup: light the panel from the last frame before anything else
+Imported first by the runtimes, before requests/PIL/NumPy and before token
+loading or the first poll. Creates the matrix, paints the persisted snapshot
+of the last displayed frame and measures how long that took from process
+start. FrameSnapshot keeps the snapshot up to date while running
+"""
+
+import os
+import time
+import zlib
+import atexit
+import struct
+import threading
+
+# Configuration
+SNAPSHOT_FILE = os.environ.get('LAST_FRAME_FILE', '.last_frame')
+SNAPSHOT_INTERVAL = 5.0  # min seconds between snapshot writes (spares the SD card)
+
+# Snapshot layout: magic, width, height, crc32 of the pixels, then raw RGB
+MAGIC = b'SVL1'
+HEADER = struct.Struct('<4sHHI')
+
+# Filled in by start()
+matrix_classes = None
+matrix = None
+snapshot = None
+first_pixel = None  # seconds from process start to the snapshot on the panel
+first_live = None   # seconds from process start to the first live frame
+
+
+def process_age():
+    """Seconds since this process was started (includes interpreter startup)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime), counted after the parenthesised command name
+            started = int(f.read().rsplit(')', 1)[1].split()[19]) / os.sysconf('SC_CLK_TCK')
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def load_matrix_classes():
+    """(RGBMatrix, RGBMatrixOptions, real hardware?) for this environment"""
+    global matrix_classes
+    if matrix_classes is None:
+        matrix_classes = _import_matrix_classes()
+    return matrix_classes
+
+
+def _import_matrix_classes():
+    try:
+        if os.environ.get('SIM_MATRIX') == '1':
+            raise ImportError("simulated matrix requested")
+        if os.environ.get('MATRIX_RENDERER') == 'shm':
+            # Frames go to the separate renderer process (frame_renderer.py)
+            from shm_matrix import RGBMatrix, RGBMatrixOptions
+        else:
+            from rgbmatrix import RGBMatrix, RGBMatrixOptions
+        return RGBMatrix, RGBMatrixOptions, True
+    except ImportError:
+        print("RGB Matrix library not available - using simulated matrix")
+        from sim_matrix import RGBMatrix, RGBMatrixOptions
+        return RGBMatrix, RGBMatrixOptions, False
+
+
+def read_snapshot(path=SNAPSHOT_FILE):
+    """(width, height, raw RGB bytes) of the saved frame, or None"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, width, height, crc = HEADER.unpack_from(data)
+    pixels = data[HEADER.size:]
+    if magic != MAGIC or len(pixels) != width * height * 3 or zlib.crc32(pixels) != crc:
+        return None
+    return width, height, pixels
+
+
+def paint(target, width, height, pixels):
+    """Draw raw RGB onto a matrix canvas without needing PIL"""
+    canvas = target.CreateFrameCanvas()
+    set_pixel = canvas.SetPixel
+    i = 0
+    for y in range(height):
+        for x in range(width):
+            set_pixel(x, y, pixels[i], pixels[i + 1], pixels[i + 2])
+            i += 3
+    target.SwapOnVSync(canvas)
+
+
+def start(settings, path=SNAPSHOT_FILE):
+    """Create the matrix with settings and show the last frame; returns the matrix"""
+    global matrix, snapshot, first_pixel
+    from panel_layout import LAYOUT
+    RGBMatrix, RGBMatrixOptions, _ = load_matrix_classes()
+
+    try:
+        options = RGBMatrixOptions()
+        LAYOUT.apply_options(options)  # panel size, chain and parallel from MATRIX_*
+        for name, value in settings.items():
+            setattr(options, name, value)
+        matrix = RGBMatrix(options=options)
+    except Exception as e:
+        print(f"Failed to initialize RGB matrix: {e}")
+        return None
+
+    snapshot = FrameSnapshot(path)
+    saved = read_snapshot(path)
+    if saved and saved[:2] == (matrix.width, matrix.height):
+        paint(matrix, *saved)
+        first_pixel = process_age()
+        if first_pixel is not None:
+            print(f"⚡ Last frame on the panel {first_pixel:.2f}s after start")
+    return matrix
+
+
+def report():
+    """Print and export the startup timings"""
+    import metrics
+    parts = []
+    if first_pixel is not None:
+        metrics.observe('startup_first_pixel', first_pixel)
+        parts.append(f"last frame after {first_pixel:.2f}s")
+    if first_live is not None:
+        metrics.observe('startup_first_live_frame', first_live)
+        parts.append(f"live art after {first_live:.2f}s")
+    if parts:
+        print("⚡ Startup: " + ", ".join(parts))
+
+
+class FrameSnapshot:
+    """Persists the last presented frame, at most every SNAPSHOT_INTERVAL seconds"""
+
+    def __init__(self, path=SNAPSHOT_FILE, interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pending = None  # (width, height, pixels) not yet written
+        self.dirty = threading.Event()
+        self.write_lock = threading.Lock()  # writer thread vs. the flush at exit
+        self.thread = None
+
+    def update(self, image):
+        """FrameOutput hook: remember the physical frame that just went on the panel"""
+        global first_live
+        if first_live is None:
+            first_live = process_age()
+            threading.Thread(target=report, name='startup-report', daemon=True).start()
+        with self.lock:
+            self.pending = (image.width, image.height, image.tobytes())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._writer, name='snapshot', daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+        self.dirty.set()
+
+    def flush(self):
+        """Write a frame still waiting out the interval (at exit)"""
+        with self.lock:
+            pending, self.pending = self.pending, None
+        if pending:
+            self.save(*pending)
+
+    def _writer(self):
+        while True:
+            self.dirty.wait()
+            self.dirty.clear()
+            with self.lock:
+                pending, self.pending = self.pending, None
+            if pending:
+                self.save(*pending)
+            time.sleep(self.interval)
+
+    def save(self, width, height, pixels):
+        """Write atomically: temp file, fsync, then rename over the old snapshot"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with self.write_lock:
+                with open(tmp_path, 'wb') as f:
+                    f.write(HEADER.pack(MAGIC, width, height, zlib.crc32(pixels)) + pixels)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save last frame: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Hot-path instrumentation and a Prometheus text metrics endpoint
+Stage latencies go into histograms (cumulative buckets plus a rolling window
+for recent quantiles); existing stats dicts are exported as counters
+"""
+
+import os
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configuration
+METRICS_ADDR = os.environ.get('METRICS_ADDR', '0.0.0.0')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9101'))  # 0 disables the endpoint
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WINDOW = 256  # recent samples kept per stage for rolling quantiles
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """Prometheus-style histogram with a rolling window of recent samples"""
+
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MetricsRegistry:
+    """Stage histograms, plain counters and exported stats dicts"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.stats_sources = []  # (prefix, dict) read at scrape time
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def register_stats(self, prefix, stats):
+        """Export a live stats dict (e.g. ArtCache.stats) as counters"""
+        with self.lock:
+            self.stats_sources.append((prefix, stats))
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            if self.stages:
+                lines.append('# HELP visualizer_stage_seconds Time spent per hot-path stage')
+                lines.append('# TYPE visualizer_stage_seconds histogram')
+                for stage, h in sorted(self.stages.items()):
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f'visualizer_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                    lines.append(f'visualizer_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                    lines.append(f'visualizer_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                    lines.append(f'visualizer_stage_seconds_count{{stage="{stage}"}} {h.count}')
+
+                lines.append('# HELP visualizer_stage_recent_seconds Quantiles over the last samples per stage')
+                lines.append('# TYPE visualizer_stage_recent_seconds gauge')
+                for stage, h in sorted(self.stages.items()):
+                    for q in QUANTILES:
+                        value = h.quantile(q)
+                        if value is not None:
+                            lines.append(f'visualizer_stage_recent_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+
+            counters = dict(self.counters)
+            for prefix, stats in self.stats_sources:
+                for key, value in list(stats.items()):
+                    if isinstance(value, (int, float)):
+                        counters[f'{prefix}_{key}'] = value
+
+        for name, value in sorted(counters.items()):
+            lines.append(f'# TYPE visualizer_{name}_total counter')
+            lines.append(f'visualizer_{name}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the instrumented modules
+REGISTRY = MetricsRegistry()
+timer = REGISTRY.timer
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+register_stats = REGISTRY.register_stats
+
+
+def start_metrics_server(port=METRICS_PORT, addr=METRICS_ADDR, registry=REGISTRY):
+    """Serve /metrics on a background thread; returns the server or None"""
+    if not port:
+        return None
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️  Metrics endpoint not started on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    print(f"📈 Metrics on http://{addr}:{port}/metrics")
+    return server
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Dominant colors of album art, computed once per album
+A small k-means over the pixels of the processed frame, all NumPy. The art
+cache stores the palette in the frame file and attaches it to the frame it
+returns (image.info['palette']), so anything drawing with the art's colors
+reads it from there instead of recomputing it
+"""
+
+import os
+import colorsys
+import numpy as np
+
+# Configuration
+PALETTE_SIZE = int(os.environ.get('PALETTE_SIZE', '5'))  # colors per album
+ITERATIONS = 8          # k-means rounds; 32x32 art settles in fewer
+MIN_SHARE = 0.05        # colors covering less of the art never become the accent
+TEXT_FLOOR = 180        # brightest channel of a text color, so it reads on dark bands
+
+
+class Palette:
+    """Dominant colors of one frame, most common first, with their share of the pixels"""
+
+    def __init__(self, colors, shares):
+        self.colors = [tuple(int(v) for v in color) for color in colors]
+        self.shares = [float(share) for share in shares]
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __repr__(self):
+        return f"Palette({', '.join(f'#{r:02x}{g:02x}{b:02x}:{s:.2f}' for (r, g, b), s in zip(self.colors, self.shares))})"
+
+    @property
+    def dominant(self):
+        """The most common color"""
+        return self.colors[0] if self.colors else (0, 0, 0)
+
+    @property
+    def accent(self):
+        """The most vivid color that covers a noticeable part of the art"""
+        candidates = [color for color, share in zip(self.colors, self.shares) if share >= MIN_SHARE]
+        if not candidates:
+            return self.dominant
+
+        def vividness(color):
+            _, saturation, value = colorsys.rgb_to_hsv(*(v / 255.0 for v in color))
+            return saturation * value
+
+        return max(candidates, key=vividness)
+
+    def to_bytes(self):
+        """Colors and shares (in 1/255) packed for the art cache"""
+        return bytes(v for color, share in zip(self.colors, self.shares)
+                     for v in (*color, min(255, round(share * 255))))
+
+    @classmethod
+    def from_bytes(cls, data):
+        entries = np.frombuffer(data, dtype=np.uint8).reshape(-1, 4)
+        return cls(entries[:, :3].tolist(), (entries[:, 3] / 255.0).tolist())
+
+
+def extract_palette(image, size=PALETTE_SIZE, iterations=ITERATIONS):
+    """Palette of an RGB image by k-means over its pixels"""
+    pixels = np.asarray(image.convert('RGB'), dtype=np.float32).reshape(-1, 3)
+    size = max(1, min(size, len(pixels)))
+
+    # Deterministic start: mean color of each luminance band, darkest to brightest
+    luma = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    bands = np.array_split(np.argsort(luma, kind='stable'), size)
+    centers = np.stack([pixels[band].mean(axis=0) for band in bands])
+
+    for _ in range(iterations):
+        labels = _nearest(pixels, centers)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=len(centers)) for c in range(3)], axis=1)
+        used = counts > 0
+        updated = sums[used] / counts[used, None]
+        if len(updated) == len(centers) and np.abs(updated - centers).max() < 0.5:
+            centers = updated
+            break
+        centers = updated.astype(np.float32)  # empty clusters are dropped
+
+    counts = np.bincount(_nearest(pixels, centers), minlength=len(centers))
+    order = [i for i in np.argsort(-counts, kind='stable') if counts[i]]
+    return Palette(np.rint(centers[order]).clip(0, 255), counts[order] / len(pixels))
+
+
+def _nearest(pixels, centers):
+    """Index of the nearest center for every pixel"""
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, and |p|^2 is the same for every center
+    centers = centers.astype(np.float32)
+    return ((centers * centers).sum(axis=1) - 2.0 * pixels @ centers.T).argmin(axis=1)
+
+
+def palette_of(image):
+    """The image's palette: the cached one when it came from the art cache, else extracted now"""
+    palette = image.info.get('palette')
+    if palette is None:
+        palette = extract_palette(image)
+        image.info['palette'] = palette
+    return palette
+
+
+def readable(color, floor=TEXT_FLOOR):
+    """color scaled up until its brightest channel reaches floor (hue kept)"""
+    brightest = max(color)
+    if brightest >= floor:
+        return color
+    if brightest == 0:
+        return (floor, floor, floor)
+    scale = floor / brightest
+    return tuple(min(255, int(v * scale)) for v in color)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Panel geometry: how the logical picture maps onto chained/parallel panels
+The physical position of every logical pixel is worked out once into an
+index table, so remapping a frame is a single NumPy gather instead of
+per-pixel coordinate math. NumPy is only loaded once a frame actually
+needs remapping, so the geometry is cheap to read at startup
+"""
+
+import os
+
+# Configuration (per panel size, wiring, then how the panels are mounted)
+PANEL_ROWS = int(os.environ.get('MATRIX_ROWS', '32'))
+PANEL_COLS = int(os.environ.get('MATRIX_COLS', '32'))
+CHAIN_LENGTH = int(os.environ.get('MATRIX_CHAIN', '1'))
+PARALLEL = int(os.environ.get('MATRIX_PARALLEL', '1'))
+GRID = os.environ.get('MATRIX_GRID', '')            # mounted panels as COLSxROWS, e.g. 2x2 (default chain x parallel)
+ROTATION = int(os.environ.get('MATRIX_ROTATE', '0'))  # 0, 90, 180 or 270 degrees clockwise
+MIRROR = os.environ.get('MATRIX_MIRROR', '')        # '', 'h', 'v' or 'hv'
+SERPENTINE = os.environ.get('MATRIX_SERPENTINE', '0') == '1'  # every other panel row mounted upside down
+
+
+class PanelLayout:
+    """Logical frame size plus the logical -> physical pixel index table"""
+
+    def __init__(self, rows=PANEL_ROWS, cols=PANEL_COLS, chain_length=CHAIN_LENGTH, parallel=PARALLEL,
+                 grid=None, rotation=ROTATION, mirror=MIRROR, serpentine=SERPENTINE):
+        if rotation not in (0, 90, 180, 270):
+            raise ValueError(f"Rotation must be 0, 90, 180 or 270, not {rotation}")
+        grid_cols, grid_rows = grid or (chain_length, parallel)
+        if grid_cols * grid_rows != chain_length * parallel:
+            raise ValueError(f"A {grid_cols}x{grid_rows} grid needs {grid_cols * grid_rows} panels, "
+                             f"chain {chain_length} x parallel {parallel} drives {chain_length * parallel}")
+
+        self.rows = rows
+        self.cols = cols
+        self.chain_length = chain_length
+        self.parallel = parallel
+        self.grid = (grid_cols, grid_rows)
+        self.rotation = rotation
+        self.mirror = mirror
+        self.serpentine = serpentine
+
+        # What rpi-rgb-led-matrix sees: panels side by side per chain, chains stacked
+        self.physical_width = cols * chain_length
+        self.physical_height = rows * parallel
+        # The mounted surface, then the picture after rotation
+        surface_width, surface_height = grid_cols * cols, grid_rows * rows
+        if rotation in (90, 270):
+            self.width, self.height = surface_height, surface_width
+        else:
+            self.width, self.height = surface_width, surface_height
+        self.art_size = min(self.width, self.height)
+        self.surface = (surface_width, surface_height)
+        self._identity = None
+        self.byte_index = None
+        self.physical_index = None  # inverse table, built on first physical_xy()
+
+    @property
+    def is_identity(self):
+        if self._identity is None and self.rotation == 0 and not self.mirror \
+                and self.grid == (self.chain_length, self.parallel) \
+                and not (self.serpentine and self.parallel > 1):
+            self._identity = True  # plain wiring, no table needed
+        if self._identity is None:
+            import numpy as np
+            index = self._build_index(*self.surface)
+            self._identity = (self.width, self.height) == (self.physical_width, self.physical_height) \
+                and bool(np.array_equal(index, np.arange(index.size)))
+            # Byte offsets so the gather works directly on packed RGB data
+            self.byte_index = (index[:, None] * 3 + np.arange(3)).ravel()
+        return self._identity
+
+    @classmethod
+    def from_env(cls):
+        grid = tuple(int(n) for n in GRID.lower().split('x')) if GRID else None
+        return cls(grid=grid)
+
+    def _build_index(self, surface_width, surface_height):
+        """Logical pixel number shown by each physical pixel, in physical order"""
+        import numpy as np
+        py, px = np.mgrid[0:self.physical_height, 0:self.physical_width]
+
+        # Which panel in the wiring order, and where inside it
+        panel = (py // self.rows) * self.chain_length + px // self.cols
+        u, v = px % self.cols, py % self.rows
+
+        # Where that panel is mounted
+        grid_cols = self.grid[0]
+        grid_row, grid_col = panel // grid_cols, panel % grid_cols
+        if self.serpentine:
+            flipped = grid_row % 2 == 1
+            grid_col = np.where(flipped, grid_cols - 1 - grid_col, grid_col)
+            u = np.where(flipped, self.cols - 1 - u, u)
+            v = np.where(flipped, self.rows - 1 - v, v)
+        sx = grid_col * self.cols + u
+        sy = grid_row * self.rows + v
+
+        if 'h' in self.mirror:
+            sx = surface_width - 1 - sx
+        if 'v' in self.mirror:
+            sy = surface_height - 1 - sy
+
+        # Surface position -> picture position for a picture rotated clockwise
+        if self.rotation == 0:
+            lx, ly = sx, sy
+        elif self.rotation == 90:
+            lx, ly = sy, self.height - 1 - sx
+        elif self.rotation == 180:
+            lx, ly = surface_width - 1 - sx, surface_height - 1 - sy
+        else:
+            lx, ly = self.width - 1 - sy, sx
+        return (ly * self.width + lx).ravel()
+
+    def physical_xy(self, x, y):
+        """Physical canvas position of logical pixel (x, y), for single-pixel updates"""
+        if self.is_identity:
+            return x, y
+        if self.physical_index is None:
+            import numpy as np
+            index = self.byte_index[::3] // 3
+            self.physical_index = np.empty(index.size, dtype=np.int64)
+            self.physical_index[index] = np.arange(index.size)
+        p = int(self.physical_index[y * self.width + x])
+        return p % self.physical_width, p // self.physical_width
+
+    def apply_options(self, options):
+        """Set the wiring on an RGBMatrixOptions"""
+        options.rows = self.rows
+        options.cols = self.cols
+        options.chain_length = self.chain_length
+        options.parallel = self.parallel
+        return options
+
+    def remap(self, image):
+        """Logical RGB frame -> physical canvas image"""
+        if self.is_identity:
+            return image
+        import numpy as np
+        from PIL import Image
+        pixels = np.frombuffer(image.tobytes(), dtype=np.uint8)
+        return Image.frombuffer('RGB', (self.physical_width, self.physical_height),
+                                pixels[self.byte_index].tobytes(), 'raw', 'RGB', 0, 1)
+
+    def describe(self):
+        return (f"{self.width}x{self.height} on {self.chain_length * self.parallel} "
+                f"{self.cols}x{self.rows} panel(s)")
+
+
+# Process-wide layout from the MATRIX_* environment
+LAYOUT = PanelLayout.from_env()
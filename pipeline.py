@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Staged fetch / process / render pipeline
+A poller thread, a small pool of album art workers and a render thread that
+owns the matrix, connected by latest-wins queues so stale work is dropped
+"""
+
+import time
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+
+ART_WORKERS = 2
+
+# What the poller asks the art workers for
+ArtRequest = namedtuple('ArtRequest', 'key album_id image_url track')
+
+
+class LatestQueue:
+    """Single-slot queue where a newer item replaces an unconsumed older one"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.has_item = False
+        self.woken = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if self.has_item:
+                self.dropped += 1
+            self.item = item
+            self.has_item = True
+            self.cond.notify()
+
+    def wake(self):
+        """Make a waiting get() return now (None if there is no item)"""
+        with self.cond:
+            self.woken = True
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Take the latest item, or None if nothing arrived within timeout"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.has_item or self.woken, timeout)
+            self.woken = False
+            if not self.has_item:
+                return None
+            item = self.item
+            self.item = None
+            self.has_item = False
+            return item
+
+
+class VisualizerPipeline:
+    """Runs polling, art loading and rendering on separate threads
+
+    poll_once() returns an ArtRequest for what should be on screen (or None),
+    next_delay() says how long to wait before polling again,
+    load_art(request) returns a frame (or None) and runs on a worker thread,
+    present(request, image) runs on the render thread, as does anything
+    passed to call_on_render() and the set_tick() callback.
+    """
+
+    def __init__(self, poll_once, next_delay, load_art, present, workers=ART_WORKERS):
+        self.poll_once = poll_once
+        self.next_delay = next_delay
+        self.load_art = load_art
+        self.present = present
+        self.art_queue = LatestQueue()
+        self.frame_queue = LatestQueue()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='art-worker')
+        self.slots = threading.Semaphore(workers)  # bounds in-flight downloads
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.wanted_key = None  # art the poller most recently asked for
+        self.render_calls = deque()  # other drawing for the render thread, in order
+        self.tick = None  # periodic drawing between frames, e.g. the overlay
+        self.tick_interval = 0.0
+        self.next_tick = 0.0
+        self.threads = []
+        self.stats = {'requests': 0, 'frames': 0, 'stale_dropped': 0, 'failed': 0}
+
+    def start(self):
+        for name, target in (('poller', self._poll_loop),
+                             ('art-dispatch', self._dispatch_loop),
+                             ('render', self._render_loop)):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def run_forever(self):
+        """Start the stages and block until stop() or Ctrl+C"""
+        self.start()
+        try:
+            while not self.stop_event.wait(0.5):
+                pass
+        finally:
+            self.stop()
+
+    def call_on_render(self, fn):
+        """Run fn() on the render thread, ahead of the next frame"""
+        self.render_calls.append(fn)
+        self.frame_queue.wake()
+
+    def set_tick(self, fn, interval):
+        """Call fn() on the render thread every interval seconds, between frames"""
+        self.tick_interval = interval
+        self.next_tick = time.monotonic()
+        self.tick = fn
+
+    def _run_tick(self):
+        """The periodic callback if it is due; returns seconds until it is due again"""
+        if not self.tick:
+            return 0.5
+        now = time.monotonic()
+        if now >= self.next_tick:
+            # A transition may have held the thread: skip missed ticks rather than catching up
+            self.next_tick = max(self.next_tick + self.tick_interval, now)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error rendering: {e}")
+            now = time.monotonic()
+        return max(0.0, min(0.5, self.next_tick - now))
+
+    def _poll_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                request = self.poll_once()
+            except Exception as e:
+                print(f"Error polling: {e}")
+                request = None
+
+            if request is not None:
+                with self.lock:
+                    is_new = request.key != self.wanted_key
+                    if is_new:
+                        self.wanted_key = request.key
+                if is_new:
+                    self.stats['requests'] += 1
+                    self.art_queue.put(request)
+
+            self.stop_event.wait(self.next_delay())
+
+    def _dispatch_loop(self):
+        while not self.stop_event.is_set():
+            # Wait for a free worker first, so a newer request can still
+            # replace an older one while every worker is busy
+            if not self.slots.acquire(timeout=0.5):
+                continue
+            request = self.art_queue.get(timeout=0.5)
+            if request is None:
+                self.slots.release()
+                continue
+            try:
+                future = self.executor.submit(self.load_art, request)
+            except RuntimeError:
+                self.slots.release()  # executor shut down
+                return
+            future.add_done_callback(lambda f, request=request: self._art_done(request, f))
+
+    def _art_done(self, request, future):
+        self.slots.release()
+        try:
+            image = None if future.cancelled() else future.result()
+        except Exception as e:
+            print(f"Error loading album art: {e}")
+            image = None
+
+        with self.lock:
+            current = request.key == self.wanted_key
+            if image is None and current:
+                self.wanted_key = None  # let the next poll retry
+
+        if image is None:
+            self.stats['failed'] += 1
+        elif not current:
+            # The track moved on while this was downloading
+            self.stats['stale_dropped'] += 1
+        else:
+            self.frame_queue.put((request, image))
+
+    def _render_loop(self):
+        while not self.stop_event.is_set():
+            item = self.frame_queue.get(timeout=self._run_tick())
+            while self.render_calls:
+                try:
+                    self.render_calls.popleft()()
+                except Exception as e:
+                    print(f"Error rendering: {e}")
+            if item is None:
+                continue
+            request, image = item
+            with self.lock:
+                if request.key != self.wanted_key:
+                    self.stats['stale_dropped'] += 1
+                    continue
+            try:
+                self.present(request, image)
+                self.stats['frames'] += 1
+            except Exception as e:
+                print(f"Error rendering: {e}")
+
+    def summary(self):
+        """Human readable pipeline counters"""
+        s = self.stats
+        return (f"{s['requests']} art requests, {s['frames']} frames rendered, "
+                f"{s['stale_dropped'] + self.art_queue.dropped} stale dropped, {s['failed']} failed")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling for the currently-playing endpoint
+Polls sparsely mid-track, tightly around the predicted end of the track,
+backs off when paused or idle and honours Retry-After on 429s
+"""
+
+import time
+
+# Configuration (seconds)
+FAST_INTERVAL = 0.5      # around the predicted track end
+MAX_TRACK_INTERVAL = 10.0  # longest gap while a track is playing
+END_LEAD = 1.5           # start fast polling this long before the predicted end
+PAUSED_INTERVAL = 3.0    # first poll after pausing / nothing playing
+IDLE_MAX_INTERVAL = 30.0  # cap for the paused/idle backoff
+ERROR_INTERVAL = 2.0     # first retry after a failed poll
+ERROR_MAX_INTERVAL = 60.0
+
+
+class PollScheduler:
+    """Works out how long to wait before the next currently-playing poll"""
+
+    def __init__(self, fast_interval=FAST_INTERVAL, max_track_interval=MAX_TRACK_INTERVAL,
+                 end_lead=END_LEAD, paused_interval=PAUSED_INTERVAL,
+                 idle_max_interval=IDLE_MAX_INTERVAL, idle_grace=0.0):
+        self.fast_interval = fast_interval
+        self.max_track_interval = max_track_interval
+        self.end_lead = end_lead
+        self.paused_interval = paused_interval
+        self.idle_max_interval = idle_max_interval
+        self.idle_grace = idle_grace  # keep polling at paused_interval this long before backing off
+        self.idle_since = None
+        self.state = 'starting'
+        self.observed_at = time.monotonic()
+        self.remaining = None
+        self.idle_delay = paused_interval
+        self.error_delay = ERROR_INTERVAL
+        self.retry_after = 0.0
+        self.stats = {'polls': 0, 'rate_limited': 0, 'errors': 0}
+
+    def observe(self, status_code, track_data=None, headers=None):
+        """Record the outcome of a poll (status_code None means the request failed)"""
+        self.stats['polls'] += 1
+        self.observed_at = time.monotonic()
+        self.retry_after = 0.0
+
+        if status_code == 429:
+            self.stats['rate_limited'] += 1
+            self.state = 'rate_limited'
+            try:
+                self.retry_after = float((headers or {}).get('Retry-After', 0))
+            except ValueError:
+                self.retry_after = 0.0
+            self.retry_after = max(self.retry_after, self.error_delay)
+            self.error_delay = min(self.error_delay * 2, ERROR_MAX_INTERVAL)
+            return
+
+        if status_code is None or status_code >= 500 or status_code == 401:
+            self.stats['errors'] += 1
+            self.state = 'error'
+            self.retry_after = self.error_delay
+            self.error_delay = min(self.error_delay * 2, ERROR_MAX_INTERVAL)
+            return
+
+        self.error_delay = ERROR_INTERVAL
+        item = (track_data or {}).get('item') if status_code == 200 else None
+        if item and track_data.get('is_playing'):
+            duration = item.get('duration_ms') or 0
+            progress = track_data.get('progress_ms') or 0
+            self.remaining = max(0.0, (duration - progress) / 1000.0) if duration else None
+            if self.state != 'playing':
+                self.idle_delay = self.paused_interval
+            self.state = 'playing'
+        else:
+            # Paused, 204 No Content or nothing playing
+            if self.state != 'idle':
+                self.idle_since = self.observed_at
+                self.idle_delay = self.paused_interval
+            elif self.observed_at - self.idle_since >= self.idle_grace:
+                self.idle_delay = min(self.idle_delay * 2, self.idle_max_interval)
+            self.state = 'idle'
+            self.remaining = None
+
+    def next_delay(self):
+        """Seconds to wait before polling again, measured from now"""
+        elapsed = time.monotonic() - self.observed_at
+
+        if self.state in ('rate_limited', 'error'):
+            delay = self.retry_after
+        elif self.state == 'idle':
+            delay = self.idle_delay
+        elif self.state == 'playing' and self.remaining is not None:
+            # Sleep until just before the predicted end, then poll fast
+            delay = min(self.max_track_interval, self.remaining - self.end_lead)
+            delay = max(self.fast_interval, delay)
+        else:
+            delay = self.fast_interval
+
+        return max(0.0, delay - elapsed)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Prefetch the next track's album art from the playback queue
+Near the end of the current track, asks the player queue endpoint what plays
+next and loads that art into the frame cache ahead of the song boundary
+"""
+
+import threading
+import requests
+from http_client import get_client, api_url
+from album_art import load_album_art, pick_image_url, MATRIX_SIZE
+from pipeline import LatestQueue
+
+PREFETCH_LEAD = 20.0  # seconds before the predicted end of the track
+
+
+class Prefetcher:
+    """Loads the art for the next queued track into an ArtCache"""
+
+    def __init__(self, tokens, art_cache, size=MATRIX_SIZE, lead=PREFETCH_LEAD):
+        self.tokens = tokens
+        self.art_cache = art_cache
+        self.size = size
+        self.lead = lead
+        self.http = get_client()
+        self.requests = LatestQueue()
+        self.prefetched_for = None  # current track id we already prefetched after
+        self.enabled = True
+        self.thread = None
+        self.stats = {'queue_lookups': 0, 'prefetched': 0, 'failures': 0}
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, name='prefetch', daemon=True)
+            self.thread.start()
+
+    def observe(self, track_data):
+        """Feed each currently-playing response; schedules a prefetch near the end"""
+        if not self.enabled or not track_data or not track_data.get('is_playing'):
+            return
+        item = track_data.get('item') or {}
+        duration = item.get('duration_ms')
+        progress = track_data.get('progress_ms')
+        if not item.get('id') or duration is None or progress is None:
+            return
+
+        remaining = (duration - progress) / 1000.0
+        if remaining <= self.lead and item['id'] != self.prefetched_for:
+            self.prefetched_for = item['id']
+            self.requests.put(item['id'])
+
+    def _worker(self):
+        while True:
+            if self.requests.get() is None:
+                continue
+            try:
+                self.prefetch_next()
+            except Exception as e:
+                # A bad queue page or art error only costs this prefetch, not the thread
+                print(f"Prefetch failed: {e}")
+                self.stats['failures'] += 1
+
+    def next_track(self):
+        """The first track in the user's playback queue, or None"""
+        self.stats['queue_lookups'] += 1
+        url = api_url('/v1/me/player/queue')
+        response = self.http.get(url, conditional=True, headers=self.tokens.auth_header())
+        if response.status_code == 401 and self.tokens.refresh():
+            # Expired early - the background refresh normally gets there first
+            response = self.http.get(url, conditional=True, headers=self.tokens.auth_header())
+        if response.status_code == 403:
+            # Token predates the user-read-playback-state scope
+            print("Queue not readable with the current token - prefetch disabled until re-auth")
+            self.enabled = False
+            return None
+        if response.status_code != 200:
+            return None
+        queue = response.json().get('queue') or []
+        return queue[0] if queue else None
+
+    def prefetch_next(self):
+        """Load the next track's art into the cache; returns the frame or None"""
+        try:
+            track = self.next_track()
+        except requests.RequestException as e:
+            print(f"Prefetch failed: {e}")
+            self.stats['failures'] += 1
+            return None
+        if not track:
+            return None
+
+        album = track.get('album') or {}
+        images = album.get('images') or []
+        if not images:
+            return None
+
+        image_url = pick_image_url(images, self.size)
+        image = load_album_art(self.art_cache, album.get('id'), image_url, self.size)
+        if image is None:
+            self.stats['failures'] += 1
+        else:
+            self.stats['prefetched'] += 1
+        return image
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Bulk pre-warming of the art cache from the user's library
+Pages through the user's playlists and saved albums, skips albums already
+cached and looks the rest up through the batch albums endpoint (20 ids per
+request). Art is downloaded and processed on a bounded thread pool and
+written to the on-disk art cache, so first plays are cache hits. Run it by
+hand, or set PREWARM=1 to repeat it in the background of a runtime
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from http_client import get_client, api_url
+from album_art import load_album_art, pick_image_url, MATRIX_SIZE
+from art_cache import ArtCache
+from token_store import TokenManager, CLIENT_ID
+
+# Configuration
+PREWARM = os.environ.get('PREWARM', '0') == '1'  # background job in the runtimes
+PREWARM_INTERVAL = 6 * 3600  # seconds between background runs
+PREWARM_WORKERS = 4          # concurrent downloads from the command line
+BACKGROUND_WORKERS = 2       # leave room for the polls in a running visualizer
+ALBUM_BATCH = 20             # ids per /v1/albums request (API maximum)
+PAGE_LIMIT = 50              # playlists / saved albums per page (API maximum)
+TRACK_PAGE_LIMIT = 100       # playlist tracks per page (API maximum)
+MAX_ATTEMPTS = 5             # per API request, counting 429s and token refreshes
+SOURCES = ('playlists', 'albums')
+
+
+class Prewarmer:
+    """Fills an ArtCache with the art of every album in the user's library"""
+
+    def __init__(self, tokens, art_cache, size=MATRIX_SIZE, workers=PREWARM_WORKERS):
+        self.tokens = tokens
+        self.art_cache = art_cache
+        self.size = size
+        self.workers = workers
+        self.http = get_client()
+        self.lock = threading.Lock()
+        self.resume_at = 0.0  # no API request before this (monotonic), set by 429s
+        self.stats = {'api_requests': 0, 'rate_limited': 0, 'albums_seen': 0,
+                      'already_cached': 0, 'loaded': 0, 'failures': 0}
+
+    def api_get(self, url, params=None):
+        """Parsed JSON of a Web API GET, honouring Retry-After; None if it can't be read"""
+        for _ in range(MAX_ATTEMPTS):
+            with self.lock:
+                wait = self.resume_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            response = self.http.get(url, params=params, headers=self.tokens.auth_header())
+            with self.lock:
+                self.stats['api_requests'] += 1
+
+            if response.status_code == 429:
+                try:
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                except ValueError:
+                    retry_after = 1.0
+                with self.lock:
+                    # Every thread waits: the limit is per app, not per request
+                    self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+                    self.stats['rate_limited'] += 1
+                print(f"Rate limited, pre-warm pausing {retry_after:.0f}s")
+                continue
+            if response.status_code == 401 and self.tokens.refresh():
+                continue
+            if response.status_code == 403:
+                print(f"Library not readable with the current token ({url.split('?')[0]}) - "
+                      f"re-authorize to grant playlist-read-private and user-library-read")
+                return None
+            if response.status_code != 200:
+                print(f"Pre-warm request failed: {response.status_code}")
+                return None
+            return response.json()
+        return None
+
+    def pages(self, url, params):
+        """Items of every page of a paged endpoint"""
+        while url:
+            page = self.api_get(url, params)
+            if not page:
+                return
+            yield from page.get('items') or []
+            url, params = page.get('next'), None  # next already carries offset and limit
+
+    def playlist_album_ids(self):
+        """Album ids of every track on the user's playlists, in order of appearance"""
+        album_ids = {}
+        for playlist in self.pages(api_url('/v1/me/playlists'), {'limit': PAGE_LIMIT}):
+            if not playlist or not playlist.get('id'):
+                continue
+            # Only the album id of each track; the images come from the batch lookup
+            tracks = self.pages(api_url(f"/v1/playlists/{playlist['id']}/tracks"),
+                                {'limit': TRACK_PAGE_LIMIT, 'fields': 'items(track(album(id))),next'})
+            for item in tracks:
+                album_id = (((item or {}).get('track') or {}).get('album') or {}).get('id')
+                if album_id:
+                    album_ids[album_id] = None
+        return list(album_ids)
+
+    def saved_albums(self):
+        """{album id: images} for the user's saved albums (the pages include the images)"""
+        albums = {}
+        for item in self.pages(api_url('/v1/me/albums'), {'limit': PAGE_LIMIT}):
+            album = (item or {}).get('album') or {}
+            if album.get('id'):
+                albums[album['id']] = album.get('images') or []
+        return albums
+
+    def run(self, sources=SOURCES):
+        """One pass over the library; returns the number of frames added"""
+        started = time.monotonic()
+        loaded_before = self.stats['loaded']
+        albums = {}  # album id -> images, None until looked up
+        if 'albums' in sources:
+            albums.update(self.saved_albums())
+        if 'playlists' in sources:
+            for album_id in self.playlist_album_ids():
+                albums.setdefault(album_id, None)
+
+        wanted = [album_id for album_id in albums
+                  if not self.art_cache.contains(ArtCache.key_for(album_id, None, self.size))]
+        with self.lock:
+            self.stats['albums_seen'] += len(albums)
+            self.stats['already_cached'] += len(albums) - len(wanted)
+        # More than the disk budget holds would only evict what was just loaded
+        room = max(0, self.art_cache.capacity(self.size) - (len(albums) - len(wanted)))
+        if len(wanted) > room:
+            print(f"Art cache holds about {room} more frames - pre-warming {room} of {len(wanted)} albums")
+            wanted = wanted[:room]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prewarm') as pool:
+            # Saved albums came with their images and can start downloading straight away
+            for album_id in wanted:
+                if albums[album_id]:
+                    pool.submit(self._load, album_id, albums[album_id])
+            # The rest get their image URLs from the batch endpoint while those download
+            lookup = [album_id for album_id in wanted if albums[album_id] is None]
+            for i in range(0, len(lookup), ALBUM_BATCH):
+                batch = self.api_get(api_url('/v1/albums'), {'ids': ','.join(lookup[i:i + ALBUM_BATCH])})
+                for album in (batch or {}).get('albums') or []:
+                    if album and album.get('images'):
+                        pool.submit(self._load, album['id'], album['images'])
+
+        loaded = self.stats['loaded'] - loaded_before
+        print(f"🔥 Pre-warmed {loaded} album frames ({len(albums)} albums in the library, "
+              f"{len(albums) - len(wanted)} already cached) in {time.monotonic() - started:.1f}s")
+        return loaded
+
+    def _load(self, album_id, images):
+        image_url = pick_image_url(images, self.size)
+        # Disk only: the frames in use stay in the memory tier
+        image = load_album_art(self.art_cache, album_id, image_url, self.size, remember=False)
+        with self.lock:
+            self.stats['loaded' if image is not None else 'failures'] += 1
+
+    def summary(self):
+        """Human readable pre-warm counters"""
+        s = self.stats
+        return (f"{s['loaded']} frames loaded, {s['already_cached']} already cached, "
+                f"{s['failures']} failed, {s['api_requests']} API requests, {s['rate_limited']} rate limited")
+
+
+def start_background(tokens, art_cache, size=MATRIX_SIZE, interval=PREWARM_INTERVAL):
+    """Pre-warm now and then every interval on a daemon thread; returns the Prewarmer"""
+    prewarmer = Prewarmer(tokens, art_cache, size, workers=BACKGROUND_WORKERS)
+
+    def loop():
+        while True:
+            try:
+                prewarmer.run()
+            except Exception as e:
+                # Anything (a bad page, a full disk) only costs this pass, not the next ones
+                print(f"Pre-warm failed: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='prewarm', daemon=True).start()
+    return prewarmer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the album art cache from your Spotify library")
+    parser.add_argument('--source', choices=SOURCES + ('all',), default='all',
+                        help="playlists, saved albums or both")
+    parser.add_argument('--workers', type=int, default=PREWARM_WORKERS, help="concurrent downloads")
+    parser.add_argument('--size', type=int, default=MATRIX_SIZE, help="frame size to cache")
+    args = parser.parse_args()
+
+    tokens = TokenManager(CLIENT_ID)
+    if not tokens.load():
+        print("❌ No saved tokens - run the visualizer once to authorize")
+        sys.exit(1)
+    if tokens.needs_refresh() and not tokens.refresh():
+        print("❌ Could not refresh the saved tokens - re-authorize with the visualizer")
+        sys.exit(1)
+
+    art_cache = ArtCache()
+    prewarmer = Prewarmer(tokens, art_cache, args.size, args.workers)
+    try:
+        prewarmer.run(SOURCES if args.source == 'all' else (args.source,))
+    except requests.RequestException as e:
+        print(f"❌ Pre-warm failed: {e}")
+        sys.exit(1)
+    print(f"Pre-warm: {prewarmer.summary()}")
+    print(f"Art cache: {art_cache.summary()}")
+
+
+if __name__ == "__main__":
+    main()
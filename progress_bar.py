@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Playback progress bar drawn over the album art
+progress_ms only arrives with a poll, so the position is extrapolated
+locally from the last poll and re-synced on every new one. The bar is an
+overlay: FrameOutput keeps the base frame and, at the overlay frame rate,
+repaints just the few pixels of the bar that changed instead of the whole
+frame. The leading pixel is blended in gradually so the bar moves smoothly
+even though it is only one row of 32 LEDs
+"""
+
+import os
+import time
+import threading
+
+# Configuration
+PROGRESS_BAR = os.environ.get('PROGRESS_BAR', '1') == '1'
+OVERLAY_FPS = float(os.environ.get('OVERLAY_FPS', '30'))
+BAR_COLOR = tuple(int(v) for v in os.environ.get('PROGRESS_COLOR', '255,255,255').split(','))
+
+
+class PlaybackClock:
+    """Playback position extrapolated between polls"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.progress = 0.0     # seconds, at synced_at
+        self.duration = None    # seconds, None when nothing is playing
+        self.playing = False
+        self.synced_at = time.monotonic()
+        self.stats = {'syncs': 0, 'drift_ms': 0}
+
+    def sync(self, track_data):
+        """Re-anchor on a poll result (None means nothing is playing)"""
+        now = time.monotonic()
+        track = (track_data or {}).get('item')
+        with self.lock:
+            if not track or not track.get('duration_ms'):
+                self.duration = None
+                self.playing = False
+                return
+            progress = (track_data.get('progress_ms') or 0) / 1000.0
+            if self.playing and self.duration:
+                # How far the extrapolation was off, for tuning the poll intervals
+                self.stats['drift_ms'] += int(abs(self._position(now) - progress) * 1000)
+            self.progress = progress
+            self.duration = track['duration_ms'] / 1000.0
+            self.playing = bool(track_data.get('is_playing'))
+            self.synced_at = now
+            self.stats['syncs'] += 1
+
+    def _position(self, now):
+        elapsed = now - self.synced_at if self.playing else 0.0
+        return min(self.duration, self.progress + elapsed)
+
+    def fraction(self, now=None):
+        """Share of the track played (0..1), None when nothing is playing"""
+        with self.lock:
+            if not self.duration:
+                return None
+            return self._position(time.monotonic() if now is None else now) / self.duration
+
+
+class ProgressBar:
+    """The bar's overlay pixels: {(x, y): (r, g, b, alpha)} in logical coordinates"""
+
+    def __init__(self, clock, x, y, width, color=BAR_COLOR):
+        self.clock = clock
+        self.x = x
+        self.y = y
+        self.width = width
+        self.color = color
+
+    @classmethod
+    def under_art(cls, clock, frame_width, frame_height, art_size, color=BAR_COLOR):
+        """Bar along the bottom row of art centered on the frame"""
+        return cls(clock, (frame_width - art_size) // 2, (frame_height + art_size) // 2 - 1, art_size, color)
+
+    def pixels(self):
+        fraction = self.clock.fraction()
+        if fraction is None:
+            return {}
+        filled = fraction * self.width
+        full = int(filled)
+        r, g, b = self.color
+        pixels = {(self.x + i, self.y): (r, g, b, 255) for i in range(min(full, self.width))}
+        alpha = int((filled - full) * 255)
+        if full < self.width and alpha:
+            # Leading pixel fades in over the time it takes to fill
+            pixels[(self.x + full, self.y)] = (r, g, b, alpha)
+        return pixels
+
+
+def start_overlay(output, fps=OVERLAY_FPS):
+    """Repaint the output's overlay at fps on a daemon thread (runtimes without a render thread)"""
+    interval = 1.0 / fps
+
+    def tick():
+        while True:
+            started = time.monotonic()
+            try:
+                output.refresh_overlay()
+            except Exception as e:
+                print(f"Overlay refresh failed: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    thread = threading.Thread(target=tick, name='overlay', daemon=True)
+    thread.start()
+    return thread
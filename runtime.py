@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Setup shared by the visualizer runtimes
+The overlays drawn over the art, the background cache pre-warm, /metrics,
+the browser frame stream and the overlay ticker are wired up the same way
+in spotify_visualizer.py, simple_spotify.py and simple_spotify2.py, and
+every poll response is handed to the same components in the same way
+"""
+
+import metrics
+import prewarm
+from frame_output import OverlayStack
+from frame_stream import FrameStream, start_frame_stream
+from progress_bar import ProgressBar, start_overlay, PROGRESS_BAR, OVERLAY_FPS
+from text import TrackTitle, TRACK_TITLE
+
+
+class PlaybackObserver:
+    """Hands each currently-playing response to everything that follows playback"""
+
+    def __init__(self, scheduler, detector, art_size, idle=None, clock=None, prefetcher=None):
+        self.scheduler = scheduler
+        self.detector = detector
+        self.art_size = art_size
+        self.idle = idle
+        self.clock = clock
+        self.prefetcher = prefetcher
+
+    def observe(self, response):
+        """Feed one poll response (None if the request failed)
+
+        Returns the track data when something is playing (or paused), else
+        None. Only a real "nothing playing" (a 200 without an item, or a 204)
+        clears the current track; errors and 429s leave it as it was.
+        """
+        scheduler = self.scheduler
+        if response is None:
+            scheduler.observe(None)
+            return None
+        track_data = response.json() if response.status_code == 200 else None
+        # Poll sparsely mid-track, fast near the end, slowly when idle
+        scheduler.observe(response.status_code, track_data, response.headers)
+        # Near the end of a track, warm the cache with whatever plays next
+        if self.prefetcher:
+            self.prefetcher.observe(track_data)
+        # Blank the panel after a while with nothing playing, wake on the next play
+        if self.idle:
+            self.idle.observe_poll(scheduler, track_data, self.art_size)
+        # Re-anchor the progress bar; between polls it is extrapolated
+        if self.clock and scheduler.state in ('playing', 'idle'):
+            self.clock.sync(track_data)
+
+        if track_data and track_data.get('item'):
+            return track_data
+        if scheduler.state == 'idle':
+            if self.detector.track_id is not None:
+                print("No track currently playing")
+            self.detector.no_track()
+        return None
+
+
+def setup_overlays(output, clock, art_size):
+    """Scrolling title over new art and the progress bar, repainted between frames
+
+    Returns the TrackTitle (None when turned off) for the runtime to start
+    on each new track.
+    """
+    title = TrackTitle.over_art(output.width, output.height, art_size) if TRACK_TITLE else None
+    bar = ProgressBar.under_art(clock, output.width, output.height, art_size) if PROGRESS_BAR else None
+    if title or bar:
+        output.set_overlay(OverlayStack(title, bar))
+    return title
+
+
+def start_prewarm(tokens, art_cache, art_size):
+    """Fill the art cache from the user's playlists and saved albums when PREWARM=1
+
+    Returns the Prewarmer, or None when turned off.
+    """
+    if not prewarm.PREWARM:
+        return None
+    return prewarm.start_background(tokens, art_cache, art_size)
+
+
+def start_services(output, stats, frame_stream=None, pipeline=None):
+    """Serve stats on /metrics, stream frames to browsers and tick the overlay
+
+    stats maps metric names to component stats dicts; None entries (parts
+    that aren't running) are skipped. With a VisualizerPipeline the overlay
+    is repainted by its render thread, the only one that draws; the serial
+    runtimes get a ticker thread. Returns the FrameStream.
+    """
+    for name, counters in stats.items():
+        if counters is not None:
+            metrics.register_stats(name, counters)
+    metrics.start_metrics_server()
+
+    # Push every presented frame to browser previews
+    frame_stream = frame_stream or FrameStream()
+    if output:
+        output.add_listener(frame_stream.publish)
+    start_frame_stream(frame_stream)
+
+    # Move the progress bar and the title between frames
+    if output and output.overlay:
+        if pipeline:
+            pipeline.set_tick(output.refresh_overlay, 1.0 / OVERLAY_FPS)
+        else:
+            start_overlay(output)
+    return frame_stream
@@ -3,8 +3,14 @@ const CANVAS_SIZE = 600;
 const MATRIX_SIZE = 32;
 const CLIENT_ID = 'b245d267eebd4c97a090419d44fbd396'; // Replace!
 const LED_SHAPE = 'circle'; // 'circle' or 'square'
-const LED_SPACING = CANVAS_SIZE / MATRIX_SIZE;
-const LED_RADIUS = LED_SPACING / 2.3;
+// Frame stream from the Python visualizer (frame_stream.py). Served from the Pi
+// this is just /frames; elsewhere pass ?stream=http://<pi>:8090/frames
+const FRAME_STREAM_URL = new URLSearchParams(window.location.search).get('stream') || 'frames';
+
+let lastPixels = null; // what is currently painted, for diff-only repaints
+let ledWidth = 0;      // LEDs across and down the painted frame
+let ledHeight = 0;
+let ledSpacing = CANVAS_SIZE / MATRIX_SIZE;
 
 
 // PKCE helpers
@@ -79,18 +85,61 @@ async function handleCallback() {
     }
 }
 
-function startVisualizer() {
+function showVisualizer() {
     document.getElementById('login-container').style.display = 'none';
     document.getElementById('visualizer').classList.add('active');
 
     const canvas = document.getElementById('led-matrix');
     canvas.width = CANVAS_SIZE;
     canvas.height = CANVAS_SIZE;
+    ledWidth = ledHeight = 0; // sized by the first frame painted
+    lastPixels = null;
+}
+
+function startVisualizer() {
+    showVisualizer();
 
     checkCurrentTrack();
     setInterval(checkCurrentTrack, 1000);
 }
 
+// Paint frames pushed by the Python visualizer; resolves false if there is no stream
+function startFrameStream() {
+    return new Promise(function (resolve) {
+        if (!window.EventSource) {
+            resolve(false);
+            return;
+        }
+        const source = new EventSource(FRAME_STREAM_URL);
+        let connected = false;
+
+        source.addEventListener('frame', function (event) {
+            const frame = JSON.parse(event.data);
+            if (!connected) {
+                connected = true;
+                showVisualizer();
+                resolve(true);
+            }
+            const raw = atob(frame.rgb);
+            const pixels = new Uint8Array(raw.length);
+            for (let i = 0; i < raw.length; i++) {
+                pixels[i] = raw.charCodeAt(i);
+            }
+            // Streamed frames carry their own size (chained or 64-row panels)
+            paintLEDs(pixels, 3, frame.w, frame.h);
+        });
+
+        source.onerror = function () {
+            // Not served by the visualizer: fall back to polling Spotify from here.
+            // Once connected, EventSource reconnects on its own.
+            if (!connected) {
+                source.close();
+                resolve(false);
+            }
+        };
+    });
+}
+
 async function checkCurrentTrack() {
     const token = sessionStorage.getItem('access_token');
     if (!token) return;
@@ -124,41 +173,9 @@ function drawLEDMatrix(imageUrl) {
     img.crossOrigin = 'anonymous';
 
     img.onload = function () {
-        ctx.fillStyle = '#000000';
-        ctx.fillRect(0, 0, CANVAS_SIZE, CANVAS_SIZE);
-
         tempCtx.drawImage(img, 0, 0, MATRIX_SIZE, MATRIX_SIZE);
         const pixelData = tempCtx.getImageData(0, 0, MATRIX_SIZE, MATRIX_SIZE).data;
-
-        for (let y = 0; y < MATRIX_SIZE; y++) {
-            for (let x = 0; x < MATRIX_SIZE; x++) {
-                const pixelIndex = (y * MATRIX_SIZE + x) * 4;
-                const r = pixelData[pixelIndex];
-                const g = pixelData[pixelIndex + 1];
-                const b = pixelData[pixelIndex + 2];
-
-                ctx.fillStyle = `rgb(${r},${g},${b})`;
-
-                if (LED_SHAPE === 'circle') {
-                    ctx.beginPath();
-                    ctx.arc(
-                        x * LED_SPACING + LED_SPACING / 2,
-                        y * LED_SPACING + LED_SPACING / 2,
-                        LED_RADIUS,
-                        0,
-                        Math.PI * 2
-                    );
-                    ctx.fill();
-                } else if (LED_SHAPE === 'square') {
-                    ctx.fillRect(
-                        x * LED_SPACING + 1,
-                        y * LED_SPACING + 1,
-                        LED_SPACING - 2,
-                        LED_SPACING - 2
-                    );
-                }
-            }
-        }
+        paintLEDs(pixelData, 4);
     };
 
     img.onerror = function () {
@@ -168,9 +185,81 @@ function drawLEDMatrix(imageUrl) {
     img.src = imageUrl;
 }
 
-window.addEventListener('load', function () {
+// Draw the LEDs whose color changed since the last frame (stride 3 = RGB, 4 = RGBA)
+function paintLEDs(pixelData, stride, width = MATRIX_SIZE, height = MATRIX_SIZE) {
+    const canvas = document.getElementById('led-matrix');
+    const ctx = canvas.getContext('2d');
+
+    if (width !== ledWidth || height !== ledHeight) {
+        // New frame size: fit the longer side to CANVAS_SIZE and repaint everything
+        ledWidth = width;
+        ledHeight = height;
+        ledSpacing = CANVAS_SIZE / Math.max(width, height);
+        canvas.width = Math.round(width * ledSpacing);
+        canvas.height = Math.round(height * ledSpacing);
+        lastPixels = null;
+    }
+    const previous = lastPixels;
+    const current = new Uint8Array(width * height * 3);
+
+    if (!previous) {
+        ctx.fillStyle = '#000000';
+        ctx.fillRect(0, 0, canvas.width, canvas.height);
+    }
+
+    for (let y = 0; y < height; y++) {
+        for (let x = 0; x < width; x++) {
+            const pixelIndex = (y * width + x) * stride;
+            const ledIndex = (y * width + x) * 3;
+            const r = pixelData[pixelIndex];
+            const g = pixelData[pixelIndex + 1];
+            const b = pixelData[pixelIndex + 2];
+            current[ledIndex] = r;
+            current[ledIndex + 1] = g;
+            current[ledIndex + 2] = b;
+
+            if (previous && previous[ledIndex] === r && previous[ledIndex + 1] === g && previous[ledIndex + 2] === b) {
+                continue;
+            }
+
+            if (previous) {
+                // Clear the old LED so antialiased edges don't accumulate
+                ctx.fillStyle = '#000000';
+                ctx.fillRect(x * ledSpacing, y * ledSpacing, ledSpacing, ledSpacing);
+            }
+
+            ctx.fillStyle = `rgb(${r},${g},${b})`;
+
+            if (LED_SHAPE === 'circle') {
+                ctx.beginPath();
+                ctx.arc(
+                    x * ledSpacing + ledSpacing / 2,
+                    y * ledSpacing + ledSpacing / 2,
+                    ledSpacing / 2.3,
+                    0,
+                    Math.PI * 2
+                );
+                ctx.fill();
+            } else if (LED_SHAPE === 'square') {
+                ctx.fillRect(
+                    x * ledSpacing + 1,
+                    y * ledSpacing + 1,
+                    ledSpacing - 2,
+                    ledSpacing - 2
+                );
+            }
+        }
+    }
+
+    lastPixels = current;
+}
+
+window.addEventListener('load', async function () {
     createCustomCursor(); 
-    handleCallback();
+    // Prefer the Pi's stream; only log in to Spotify from the browser without one
+    if (!(await startFrameStream())) {
+        handleCallback();
+    }
 });
 
 
@@ -66,7 +66,7 @@ def main():
     print("\n" + "=" * 50)
     print("✅ Setup completed!")
     print("\nNext steps:")
-    print("1. Update CLIENT_ID in spotify_visualizer.py with your Spotify app credentials")
+    print("1. Update CLIENT_ID in token_store.py (or set SPOTIFY_CLIENT_ID) with your Spotify app credentials")
     print("2. Run: python3 spotify_visualizer.py")
     print("3. Follow the authentication prompts")
     print("\nFor auto-startup on boot, see the systemd service file.")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Shared-memory frame ring between the visualizer and frame_renderer.py
+The privileged renderer process owns the RGBMatrix and creates the ring;
+the unprivileged visualizer writes finished frames into it through
+SharedMemoryMatrix, a drop-in for RGBMatrix. Network I/O, decoding and the
+GIL then never run in the process that drives the panel
+"""
+
+import os
+import time
+import struct
+import threading
+from multiprocessing import shared_memory, resource_tracker
+from PIL import Image
+
+# Configuration
+SHM_NAME = os.environ.get('MATRIX_SHM_NAME', 'spotify_visualizer_frames')
+SLOTS = 4               # frames in flight; the reader always takes the newest
+REATTACH_INTERVAL = 2.0  # seconds between checks for a restarted renderer
+
+# Ring layout: header, then SLOTS x (slot sequence number, raw RGB frame)
+MAGIC = b'SVR1'
+HEADER = struct.Struct('<4sHHIQ')  # magic, width, height, slots, last written sequence
+SLOT_HEADER = struct.Struct('<Q')
+
+
+def _shm_path(name):
+    return f'/dev/shm/{name}'
+
+
+class FrameRing:
+    """Single-writer, single-reader ring of fixed-size RGB frames"""
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        magic, self.width, self.height, self.slots, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a frame ring")
+        self.frame_size = self.width * self.height * 3
+        self.slot_size = SLOT_HEADER.size + self.frame_size
+        self.stats = {'written': 0, 'read': 0, 'torn': 0}
+
+    @classmethod
+    def create(cls, width, height, name=SHM_NAME, slots=SLOTS, mode=0o660):
+        """Create (or replace a stale) ring
+
+        mode lets the unprivileged writer attach; the default only opens it to
+        the renderer's group, so both processes must share a group.
+        """
+        size = HEADER.size + slots * (SLOT_HEADER.size + width * height * 3)
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, width, height, slots, 0)
+        for slot in range(slots):
+            SLOT_HEADER.pack_into(shm.buf, HEADER.size + slot * (SLOT_HEADER.size + width * height * 3), 0)
+        try:
+            os.chmod(_shm_path(name), mode)
+        except OSError as e:
+            print(f"⚠️  Could not open frame ring to the renderer's group: {e}")
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name=SHM_NAME):
+        """Attach to a ring created by the renderer (FileNotFoundError if it isn't running)"""
+        shm = shared_memory.SharedMemory(name=name)
+        # Only the creator may unlink it; don't let this process's exit remove it
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm)
+
+    def _slot_offset(self, seq):
+        return HEADER.size + (seq % self.slots) * self.slot_size
+
+    def last_seq(self):
+        return HEADER.unpack_from(self.buf, 0)[4]
+
+    def write(self, pixels):
+        """Publish one frame of raw RGB bytes"""
+        seq = self.last_seq() + 1
+        offset = self._slot_offset(seq)
+        SLOT_HEADER.pack_into(self.buf, offset, 0)  # mark the slot as being written
+        self.buf[offset + SLOT_HEADER.size:offset + self.slot_size] = pixels
+        SLOT_HEADER.pack_into(self.buf, offset, seq)
+        struct.pack_into('<Q', self.buf, HEADER.size - 8, seq)
+        self.stats['written'] += 1
+        return seq
+
+    def read_latest(self, after=0):
+        """(seq, raw RGB bytes) of the newest frame newer than after, or (after, None)"""
+        for _ in range(3):
+            seq = self.last_seq()
+            if seq == after:
+                return after, None
+            offset = self._slot_offset(seq)
+            if SLOT_HEADER.unpack_from(self.buf, offset)[0] != seq:
+                self.stats['torn'] += 1
+                continue
+            pixels = bytes(self.buf[offset + SLOT_HEADER.size:offset + self.slot_size])
+            # The writer may have lapped the ring while we copied
+            if SLOT_HEADER.unpack_from(self.buf, offset)[0] != seq:
+                self.stats['torn'] += 1
+                continue
+            self.stats['read'] += 1
+            return seq, pixels
+        return after, None
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedMemoryMatrixOptions:
+    """Accepts the same settings as RGBMatrixOptions (the renderer applies its own)"""
+
+    def __init__(self):
+        self.rows = 32
+        self.cols = 32
+        self.chain_length = 1
+        self.parallel = 1
+        self.hardware_mapping = 'regular'
+        self.gpio_slowdown = 1
+        self.brightness = 100
+        self.pwm_bits = 11
+        self.pwm_lsb_nanoseconds = 130
+        self.limit_refresh_rate_hz = 0
+
+
+class SharedMemoryCanvas:
+    """An offscreen frame buffer in this process"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.image = Image.new('RGB', (width, height))
+
+    def SetPixel(self, x, y, r, g, b):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.image.putpixel((x, y), (r, g, b))
+
+    def Fill(self, r, g, b):
+        self.image.paste((r, g, b), (0, 0, self.width, self.height))
+
+    def Clear(self):
+        self.Fill(0, 0, 0)
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        if image.mode != 'RGB':
+            raise Exception("Currently, only RGB mode is supported for SetImage(). Please create images with mode 'RGB' or convert first with image = image.convert('RGB').")
+        self.image.paste(image, (offset_x, offset_y))
+
+
+class SharedMemoryMatrix(SharedMemoryCanvas):
+    """RGBMatrix stand-in that hands every presented frame to the renderer process"""
+
+    def __init__(self, options=None, name=SHM_NAME):
+        options = options or SharedMemoryMatrixOptions()
+        super().__init__(options.cols * options.chain_length, options.rows * options.parallel)
+        self.options = options
+        self.name = name
+        self.brightness = options.brightness
+        self.pwmBits = 11  # PWM depth (and dithering, --dither) is up to the renderer
+        self.lock = threading.Lock()
+        self.ring = None
+        self.inode = None
+        self.stats = {'frames': 0, 'dropped': 0}
+        self._attach()
+        # Watch for a (re)started renderer even while nothing new is presented
+        self.thread = threading.Thread(target=self._reattach_loop, name='shm-reattach', daemon=True)
+        self.thread.start()
+
+    def _reattach_loop(self):
+        while True:
+            time.sleep(REATTACH_INTERVAL)
+            try:
+                with self.lock:
+                    if self._attach():
+                        # A new renderer starts blank; give it the frame on display
+                        self.ring.write(self.image.tobytes())
+                        self.stats['frames'] += 1
+            except Exception as e:
+                print(f"⚠️  Frame ring reattach failed: {e}")
+
+    def _attach(self):
+        """(Re)attach to the renderer's ring, e.g. after it restarted
+
+        Returns True when a new ring was attached. Called with the lock held
+        (or before the watcher thread starts).
+        """
+        try:
+            inode = os.stat(_shm_path(self.name)).st_ino
+        except OSError:
+            inode = None
+        if self.ring and inode == self.inode:
+            return False
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+        try:
+            ring = FrameRing.attach(self.name)
+        except (FileNotFoundError, ValueError):
+            return False
+        if (ring.width, ring.height) != (self.width, self.height):
+            print(f"⚠️  Renderer is {ring.width}x{ring.height}, visualizer draws {self.width}x{self.height} - "
+                  f"check MATRIX_* match for both processes")
+            ring.close()
+            return False
+        print(f"🔗 Sending frames to the renderer ({self.name})")
+        self.ring, self.inode = ring, inode
+        return True
+
+    def CreateFrameCanvas(self):
+        return SharedMemoryCanvas(self.width, self.height)
+
+    def SwapOnVSync(self, canvas, framerate_fraction=1):
+        """Publish canvas to the renderer and hand back the previous front buffer"""
+        with self.lock:
+            previous = SharedMemoryCanvas(self.width, self.height)
+            previous.image = self.image
+            self.image = canvas.image
+        self.publish()
+        return previous
+
+    def Fill(self, r, g, b):
+        super().Fill(r, g, b)
+        self.publish()
+
+    def Clear(self):
+        super().Fill(0, 0, 0)
+        self.publish()
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        super().SetImage(image, offset_x, offset_y, unsafe)
+        self.publish()
+
+    def publish(self):
+        with self.lock:
+            if self.ring is None:
+                self.stats['dropped'] += 1  # renderer not running; keep going without it
+                return
+            self.ring.write(self.image.tobytes())
+            self.stats['frames'] += 1
+
+
+# Drop-in names so callers can switch with a single import
+RGBMatrix = SharedMemoryMatrix
+RGBMatrixOptions = SharedMemoryMatrixOptions
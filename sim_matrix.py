@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Headless stand-in for rpi-rgb-led-matrix
+Same API as RGBMatrix (SetPixel, Fill, Clear, SetImage, CreateFrameCanvas,
+SwapOnVSync) that records every presented frame with a timestamp, so display
+paths and transitions can run, be checked and be timed on a plain Linux box.
+On a terminal the frames are also previewed in truecolor
+"""
+
+import os
+import time
+import atexit
+import struct
+import threading
+from collections import deque
+from PIL import Image
+from terminal_preview import TerminalPreview, preview_enabled
+
+# Configuration
+RECORD_PATH = os.environ.get('SIM_MATRIX_RECORD')  # optional file to append frames to
+MAX_FRAMES = 1000  # frames kept in memory
+
+# Recording layout per frame: monotonic timestamp, width, height, raw RGB bytes
+FRAME_HEADER = struct.Struct('<dHH')
+
+
+class SimulatedMatrixOptions:
+    """Accepts the same settings as RGBMatrixOptions"""
+
+    def __init__(self):
+        self.rows = 32
+        self.cols = 32
+        self.chain_length = 1
+        self.parallel = 1
+        self.hardware_mapping = 'regular'
+        self.gpio_slowdown = 1
+        self.brightness = 100
+        self.pwm_bits = 11
+        self.pwm_lsb_nanoseconds = 130
+        self.limit_refresh_rate_hz = 0
+
+
+class SimulatedCanvas:
+    """An offscreen frame buffer"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.image = Image.new('RGB', (width, height))
+
+    def SetPixel(self, x, y, r, g, b):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.image.putpixel((x, y), (r, g, b))
+
+    def Fill(self, r, g, b):
+        self.image.paste((r, g, b), (0, 0, self.width, self.height))
+
+    def Clear(self):
+        self.Fill(0, 0, 0)
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        if image.mode != 'RGB':
+            raise Exception("Currently, only RGB mode is supported for SetImage(). Please create images with mode 'RGB' or convert first with image = image.convert('RGB').")
+        self.image.paste(image, (offset_x, offset_y))
+
+
+class SimulatedMatrix(SimulatedCanvas):
+    """The front buffer plus swap/record logic"""
+
+    def __init__(self, options=None, record_path=RECORD_PATH, max_frames=MAX_FRAMES, preview=None):
+        options = options or SimulatedMatrixOptions()
+        super().__init__(options.cols * options.chain_length, options.rows * options.parallel)
+        self.options = options
+        self.brightness = options.brightness
+        self.pwmBits = options.pwm_bits
+        self.lock = threading.Lock()
+        self.frames = deque(maxlen=max_frames)  # (timestamp, raw RGB bytes)
+        self.frame_count = 0
+        self.record_file = open(record_path, 'ab') if record_path else None
+        if preview is None:
+            preview = preview_enabled()
+        self.preview = TerminalPreview(self.width, self.height) if preview else None
+        if self.preview:
+            atexit.register(self.preview.close)
+
+    def CreateFrameCanvas(self):
+        return SimulatedCanvas(self.width, self.height)
+
+    def SwapOnVSync(self, canvas, framerate_fraction=1):
+        """Show canvas and hand back the previous front buffer"""
+        with self.lock:
+            previous = SimulatedCanvas(self.width, self.height)
+            previous.image = self.image
+            self.image = canvas.image
+        self.capture()
+        return previous
+
+    def Fill(self, r, g, b):
+        super().Fill(r, g, b)
+        self.capture()
+
+    def Clear(self):
+        super().Fill(0, 0, 0)
+        self.capture()
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        super().SetImage(image, offset_x, offset_y, unsafe)
+        self.capture()
+
+    def capture(self):
+        """Record what is currently on the (simulated) panel"""
+        timestamp = time.monotonic()
+        with self.lock:
+            pixels = self.image.tobytes()
+            self.frames.append((timestamp, pixels))
+            self.frame_count += 1
+            if self.record_file:
+                self.record_file.write(FRAME_HEADER.pack(timestamp, self.width, self.height) + pixels)
+                self.record_file.flush()
+        if self.preview:
+            self.preview.render(pixels)
+
+    def last_frame(self):
+        """The most recently presented frame as a PIL image, or None"""
+        with self.lock:
+            if not self.frames:
+                return None
+            return Image.frombytes('RGB', (self.width, self.height), self.frames[-1][1])
+
+    def frame_times(self):
+        """Timestamps of the recorded frames"""
+        with self.lock:
+            return [timestamp for timestamp, _ in self.frames]
+
+
+def read_recording(path):
+    """Yield (timestamp, image) for every frame in a recording file"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            timestamp, width, height = FRAME_HEADER.unpack(header)
+            pixels = f.read(width * height * 3)
+            if len(pixels) < width * height * 3:
+                return
+            yield timestamp, Image.frombytes('RGB', (width, height), pixels)
+
+
+# Drop-in names so callers can fall back with a single import
+RGBMatrix = SimulatedMatrix
+RGBMatrixOptions = SimulatedMatrixOptions
@@ -1,33 +1,53 @@
 #!/usr/bin/env python3
+import os
 import time
+import instant_on
+
+# Matrix settings (panel geometry comes from MATRIX_*, see panel_layout.py)
+MATRIX_SETTINGS = {
+    'hardware_mapping': 'adafruit-hat',
+    'gpio_slowdown': 4,           # Reduce flickering
+    'brightness': 100,            # Max brightness for daylight
+    'pwm_bits': 6,                # Fewer bits = higher apparent brightness
+    'pwm_lsb_nanoseconds': 100,   # Faster PWM for brighter look
+    'limit_refresh_rate_hz': 200, # Higher refresh
+}
+
+if __name__ == "__main__":
+    # Light the panel with the last frame before the heavy imports below
+    instant_on.start(MATRIX_SETTINGS)
+
 import requests
-from rgbmatrix import RGBMatrix, RGBMatrixOptions
-from PIL import Image
-import io
 import webbrowser
 import threading
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import sys
-import os
+from track_change import TrackChangeDetector
+from art_cache import ArtCache
+from album_art import load_album_art, pick_image_url
+from frame_output import FrameOutput
+from idle import IdleController, IDLE_GRACE
+from progress_bar import PlaybackClock
+from palette import palette_of
+from color import ColorPipeline
+from polling import PollScheduler
+from http_client import get_client, api_url, TOKEN_URL
+from token_store import TokenManager, CLIENT_ID
+from panel_layout import LAYOUT
+from dither import TemporalDither, dither_enabled
+import metrics
+from runtime import PlaybackObserver, setup_overlays, start_prewarm, start_services
 
 # Configuration
-CLIENT_ID = 'b245d267eebd4c97a090419d44fbd396'
 REDIRECT_URI = 'http://127.0.0.1:8888/callback'
-SCOPE = 'user-read-currently-playing'
-MATRIX_SIZE = 32
+# Playback state for the queue prefetch, playlists and saved albums for prewarm.py
+SCOPE = 'user-read-currently-playing user-read-playback-state playlist-read-private user-library-read'
+MATRIX_SIZE = LAYOUT.art_size  # square album art, centered on wider layouts
 
 def setup_matrix():
-    options = RGBMatrixOptions()
-    options.hardware_mapping = 'adafruit-hat'
-    options.rows = 32
-    options.cols = 32
-    options.gpio_slowdown = 4  # Reduce flickering
-    options.brightness = 100    # Max brightness for daylight
-    options.pwm_bits = 6       # Fewer bits = higher apparent brightness
-    options.pwm_lsb_nanoseconds = 100  # Faster PWM for brighter look
-    options.limit_refresh_rate_hz = 200  # Higher refresh
-    return RGBMatrix(options=options)
+    # Normally already created (and showing the last frame) by instant_on
+    return instant_on.matrix or instant_on.start(MATRIX_SETTINGS)
 
 # Global variables for callback handling
 auth_code = None
@@ -134,14 +154,17 @@ def print_qr_code(url):
         print(f"⚠️  Could not generate QR code: {e}")
         return False
 
-def main():
-    print("Simple Spotify Visualizer")
-    print("=" * 40)
-    
-    # Setup matrix
-    matrix = setup_matrix()
-    print(" RGB Matrix initialized")
-    
+def get_currently_playing(http, headers):
+    """Poll the currently-playing endpoint, None if the request failed"""
+    try:
+        with metrics.timer('poll'):
+            return http.get(api_url('/v1/me/player/currently-playing'), conditional=True, headers=headers)
+    except requests.RequestException as e:
+        print(f"Poll failed: {e}")
+        return None
+
+def authorize(tokens):
+    """Interactive PKCE authorization; stores the tokens on success"""
     # Get authorization URL
     auth_url, code_verifier = get_authorization_url()
     
@@ -193,11 +216,11 @@ def main():
     
     if auth_error:
         print(f"❌ Authorization failed: {auth_error}")
-        return
+        return False
     
     if not auth_code:
         print("❌ No authorization code received. Please try again.")
-        return
+        return False
     
     code = auth_code
     print("✅ Authorization code received automatically!")
@@ -211,61 +234,97 @@ def main():
         'code_verifier': code_verifier
     }
     
-    response = requests.post('https://accounts.spotify.com/api/token', data=data)
+    try:
+        response = get_client().post(TOKEN_URL, data=data)
+    except requests.RequestException as e:
+        print(f" Token exchange failed: {e}")
+        return False
+    
+    if response.status_code != 200:
+        print(f" Authentication failed: {response.status_code} - {response.text}")
+        return False
     
-    if response.status_code == 200:
-        token_data = response.json()
-        access_token = token_data['access_token']
-        print("✅ Successfully authenticated with Spotify!")
-        
-        # Start the visualizer loop
-        print("Starting visualizer loop...")
-        while True:
-            headers = {'Authorization': f'Bearer {access_token}'}
-            response = requests.get('https://api.spotify.com/v1/me/player/currently-playing', headers=headers)
-            
-            if response.status_code == 200:
-                track_data = response.json()
-                if track_data and track_data.get('item'):
-                    track = track_data['item']
-                    album = track.get('album', {})
-                    images = album.get('images', [])
-                    
-                    if images:
-                        image_url = images[0]['url']
-                        print(f"Now playing: {track['name']} by {track['artists'][0]['name']}")
-                        
-                        # Download and display image
+    tokens.update(response.json())
+    print("✅ Successfully authenticated with Spotify!")
+    return True
+
+def main():
+    print("Simple Spotify Visualizer")
+    print("=" * 40)
+    
+    # Setup matrix
+    matrix = setup_matrix()
+    # Small gain for daylight visibility, applied from a precomputed table
+    # MATRIX_DITHER=1 recovers gradient depth lost to pwm_bits = 6
+    output = FrameOutput(matrix, ColorPipeline.from_env(gain=1.25), LAYOUT,
+                         TemporalDither.for_matrix(matrix) if dither_enabled() else None,
+                         instant_on.snapshot)
+    idle = IdleController(output)
+    clock = PlaybackClock()
+    title = setup_overlays(output, clock, MATRIX_SIZE)
+    print(" RGB Matrix initialized")
+    
+    # Reuse saved tokens so restarts don't need the browser again
+    tokens = TokenManager(CLIENT_ID)
+    if tokens.load():
+        print("✅ Loaded saved Spotify tokens")
+    elif not authorize(tokens):
+        return
+    
+    # Refresh ahead of expiry in the background
+    tokens.start()
+    http = get_client()
+    
+    # Start the visualizer loop
+    print("Starting visualizer loop...")
+    detector = TrackChangeDetector()
+    art_cache = ArtCache()
+    scheduler = PollScheduler(idle_grace=IDLE_GRACE)  # slow down only once the panel is asleep
+    prewarmer = start_prewarm(tokens, art_cache, MATRIX_SIZE)
+    
+    # /metrics, browser previews and the overlay ticker
+    start_services(output, {
+        'detector': detector.stats, 'art_cache': art_cache.stats, 'poll': scheduler.stats,
+        'http': http.stats, 'token': tokens.stats,
+        'idle': idle.stats, 'output': output.stats, 'progress': clock.stats,
+        'prewarm': prewarmer and prewarmer.stats,
+    })
+    playback = PlaybackObserver(scheduler, detector, MATRIX_SIZE, idle, clock)
+    while True:
+        response = get_currently_playing(http, tokens.auth_header())
+        # If the token was rejected anyway, refresh and retry once
+        if response is not None and response.status_code == 401 and tokens.refresh():
+            response = get_currently_playing(http, tokens.auth_header())
+        track_data = playback.observe(response)
+        if track_data:
+            track = track_data['item']
+            album = track.get('album', {})
+            images = album.get('images', [])
+
+            if images:
+                image_url = pick_image_url(images, MATRIX_SIZE)
+                track_changed, art_changed = detector.observe(track, image_url)
+                if track_changed:
+                    print(f"Now playing: {track['name']} by {track['artists'][0]['name']}")
+                    if title and not art_changed and not idle.asleep:
+                        title.set_track(track)  # same album art stays, so no redraw starts it
+
+                # Download and display image only when the art changed
+                if art_changed:
+                    # Cached frames skip the download and resize entirely
+                    image = load_album_art(art_cache, album.get('id'), image_url, MATRIX_SIZE)
+                    if image:
                         try:
-                            img_response = requests.get(image_url, timeout=10)
-                            if img_response.status_code == 200:
-                                image = Image.open(io.BytesIO(img_response.content))
-                                if image.mode != 'RGB':
-                                    image = image.convert('RGB')
-                                image = image.resize((MATRIX_SIZE, MATRIX_SIZE), Image.Resampling.LANCZOS)
-                                
-                                # Display on matrix
-                                for y in range(MATRIX_SIZE):
-                                    for x in range(MATRIX_SIZE):
-                                        r, g, b = image.getpixel((x, y))
-                                        # Apply a small gain for daylight visibility
-                                        gain = 1.25
-                                        r = 255 if r * gain > 255 else int(r * gain)
-                                        g = 255 if g * gain > 255 else int(g * gain)
-                                        b = 255 if b * gain > 255 else int(b * gain)
-                                        matrix.SetPixel(x, y, r, g, b)
+                            # Display on matrix in one blit (held back while idle)
+                            if idle.show(image, detector.art_key_for(track, image_url)) and title:
+                                title.set_track(track, palette_of(image))
+                            detector.art_displayed(track, image_url)
                         except Exception as e:
-                            print(f"Error processing image: {e}")
-                    else:
-                        print("No album art available")
-                else:
-                    print("No track currently playing")
+                            print(f"Error displaying image: {e}")
             else:
-                print("No track currently playing")
-            
-            time.sleep(1)
-    else:
-        print(f" Authentication failed: {response.status_code} - {response.text}")
+                print("No album art available")
+
+        time.sleep(scheduler.next_delay())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,35 +1,56 @@
 #!/usr/bin/env python3
+import os
 import time
+import instant_on
+
+# Matrix settings (panel geometry comes from MATRIX_*, see panel_layout.py)
+MATRIX_SETTINGS = {
+    'hardware_mapping': 'adafruit-hat',
+    'gpio_slowdown': 4,           # Reduce flickering
+    'brightness': 100,            # Max brightness for daylight
+    'pwm_bits': 6,                # Fewer bits can look brighter
+    'pwm_lsb_nanoseconds': 100,   # Faster PWM
+    'limit_refresh_rate_hz': 200, # Higher refresh
+}
+
+if __name__ == "__main__":
+    # Light the panel with the last frame before the heavy imports below
+    instant_on.start(MATRIX_SETTINGS)
+
 import requests
-from rgbmatrix import RGBMatrix, RGBMatrixOptions
-from PIL import Image
-import io
 import webbrowser
 import threading
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import sys
-import os
-import random
 import math
+from track_change import TrackChangeDetector
+from art_cache import ArtCache
+from album_art import load_album_art, pick_image_url
+from frame_output import FrameOutput
+from idle import IdleController, IDLE_GRACE
+from progress_bar import PlaybackClock
+from palette import palette_of
+from color import ColorPipeline
+from polling import PollScheduler
+from http_client import get_client, api_url, TOKEN_URL
+from token_store import TokenManager, CLIENT_ID
+from panel_layout import LAYOUT
+from dither import TemporalDither, dither_enabled
+import metrics
+from runtime import PlaybackObserver, setup_overlays, start_prewarm, start_services
+from prefetch import Prefetcher
+from transitions import run_transition
 
 # Configuration
-CLIENT_ID = 'b245d267eebd4c97a090419d44fbd396'
 REDIRECT_URI = 'http://127.0.0.1:8888/callback'
-SCOPE = 'user-read-currently-playing'
-MATRIX_SIZE = 32
+# Playback state for the queue prefetch, playlists and saved albums for prewarm.py
+SCOPE = 'user-read-currently-playing user-read-playback-state playlist-read-private user-library-read'
+MATRIX_SIZE = LAYOUT.art_size  # square album art, centered on wider layouts
 
 def setup_matrix():
-    options = RGBMatrixOptions()
-    options.hardware_mapping = 'adafruit-hat'
-    options.rows = 32
-    options.cols = 32
-    options.gpio_slowdown = 4  # Reduce flickering
-    options.brightness = 100    # Max brightness for daylight
-    options.pwm_bits = 6       # Fewer bits can look brighter
-    options.pwm_lsb_nanoseconds = 100  # Faster PWM
-    options.limit_refresh_rate_hz = 200  # Higher refresh
-    return RGBMatrix(options=options)
+    # Normally already created (and showing the last frame) by instant_on
+    return instant_on.matrix or instant_on.start(MATRIX_SETTINGS)
 
 # Global variables for callback handling
 auth_code = None
@@ -115,45 +136,25 @@ def get_authorization_url():
     auth_url = f"https://accounts.spotify.com/authorize?{urlencode(params)}"
     return auth_url, code_verifier
 
-def soft_chaotic_transition(matrix, old_image, new_image, duration=1.0):
+def soft_chaotic_transition(output, old_image, new_image, duration=1.0):
     """Fast, truly random pixel replacement - no fading"""
-    
-    # Generate ALL pixel positions
-    positions = [(x, y) for x in range(MATRIX_SIZE) for y in range(MATRIX_SIZE)]
-    
-    # Shuffle for completely random appearance
-    random.shuffle(positions)
-    
-    # Very fast timing - 1 second total
-    total_pixels = len(positions)
-    base_delay = duration / total_pixels
-    
-    for i, (x, y) in enumerate(positions):
-        # Simple accelerating timing
-        progress = i / total_pixels
-        delay = base_delay * (1.0 - progress * 0.7)  # Start slow, get faster
-        
-        # Add randomness
-        delay = delay * random.uniform(0.1, 0.5)
-        
-        # Get new pixel color
-        r, g, b = new_image.getpixel((x, y))
-        
-        # Direct pixel setting - no fading
-        matrix.SetPixel(x, y, r, g, b)
-        time.sleep(delay)
+    # Precomputed random dissolve played back at a fixed frame rate
+    run_transition(output, old_image, new_image, style='dissolve', duration=duration)
 
-def display_image(matrix, image):
-    """Display image on matrix - fast and direct"""
-    # Generate random positions to avoid left-to-right pattern
-    positions = [(x, y) for x in range(MATRIX_SIZE) for y in range(MATRIX_SIZE)]
-    random.shuffle(positions)
-    
-    for x, y in positions:
-        r, g, b = image.getpixel((x, y))
-        
-        # Direct pixel setting - no fading
-        matrix.SetPixel(x, y, r, g, b)
+def display_image(output, image):
+    """Display image on matrix - one blit, swapped in on vsync"""
+    output.show(image)
+
+def present_art(output, old_image, new_image):
+    """Put new art on the matrix, old_image is what is lit (None when dark)"""
+    if old_image is None:
+        # First image (or waking up with new art)
+        print("🌊 Loading first track...")
+        display_image(output, new_image)
+    else:
+        # New art - soft chaotic transition
+        print("🌊 Transitioning to new track...")
+        soft_chaotic_transition(output, old_image, new_image, duration=1.0)
 
 def print_qr_code(url):
     """Print QR code to terminal"""
@@ -178,29 +179,17 @@ def print_qr_code(url):
         print(f"⚠️  Could not generate QR code: {e}")
         return False
 
-def refresh_access_token(refresh_token):
-    """Refresh the Spotify access token using the stored refresh_token."""
-    data = {
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'client_id': CLIENT_ID,
-    }
+def get_currently_playing(http, headers):
+    """Poll the currently-playing endpoint, None if the request failed"""
     try:
-        resp = requests.post('https://accounts.spotify.com/api/token', data=data, timeout=10)
-        if resp.status_code == 200:
-            return resp.json()
-    except Exception:
-        pass
-    return None
+        with metrics.timer('poll'):
+            return http.get(api_url('/v1/me/player/currently-playing'), conditional=True, headers=headers)
+    except requests.RequestException as e:
+        print(f"Poll failed: {e}")
+        return None
 
-def main():
-    print("🚀 Simple Spotify Visualizer")
-    print("=" * 40)
-    
-    # Setup matrix
-    matrix = setup_matrix()
-    print("✅ RGB Matrix initialized")
-    
+def authorize(tokens):
+    """Interactive PKCE authorization; stores the tokens on success"""
     # Get authorization URL
     auth_url, code_verifier = get_authorization_url()
     
@@ -252,7 +241,7 @@ def main():
     
     if auth_error:
         print(f"❌ Authorization failed: {auth_error}")
-        return
+        return False
     
     if not auth_code:
         print("❌ Automatic authorization failed.")
@@ -266,7 +255,7 @@ def main():
         code = input("Enter the authorization code: ").strip()
         if not code:
             print("No code provided. Exiting.")
-            return
+            return False
         auth_code = code
     
     print("✅ Authorization code received!")
@@ -280,94 +269,108 @@ def main():
         'code_verifier': code_verifier
     }
     
-    response = requests.post('https://accounts.spotify.com/api/token', data=data)
+    try:
+        response = get_client().post(TOKEN_URL, data=data)
+    except requests.RequestException as e:
+        print(f"❌ Token exchange failed: {e}")
+        return False
     
-    if response.status_code == 200:
-        token_data = response.json()
-        access_token = token_data['access_token']
-        refresh_token_val = token_data.get('refresh_token')
-        print("✅ Successfully authenticated with Spotify!")
-        
-        # Start the visualizer loop
-        print("🎵 Starting visualizer loop...")
-        current_image = None
-        current_track_id = None
-        
-        while True:
-            headers = {'Authorization': f'Bearer {access_token}'}
-            # Testing hook: force a 401 occasionally to exercise refresh path
-            if os.environ.get('FORCE_EXPIRE') == '1' and int(time.time()) % 15 == 0:
-                print('⚙️ Forcing token expiry test (injecting invalid token)')
-                headers = {'Authorization': 'Bearer invalid_token'}
-            response = requests.get('https://api.spotify.com/v1/me/player/currently-playing', headers=headers)
-            
-            # If token expired, refresh and retry once
-            if response.status_code == 401 and refresh_token_val:
-                print("🔄 Access token expired. Refreshing...")
-                refreshed = refresh_access_token(refresh_token_val)
-                if refreshed and refreshed.get('access_token'):
-                    access_token = refreshed['access_token']
-                    # Some refreshes may also return a new refresh token
-                    if refreshed.get('refresh_token'):
-                        refresh_token_val = refreshed['refresh_token']
-                    headers = {'Authorization': f'Bearer {access_token}'}
-                    response = requests.get('https://api.spotify.com/v1/me/player/currently-playing', headers=headers)
-                else:
-                    print("❌ Failed to refresh token. Please re-authenticate.")
-                    break
-            
-            if response.status_code == 200:
-                track_data = response.json()
-                if track_data and track_data.get('item'):
-                    track = track_data['item']
-                    track_id = track.get('id')
-                    album = track.get('album', {})
-                    images = album.get('images', [])
-                    
-                    # Check if this is a new track
-                    is_new_track = track_id != current_track_id
-                    
-                    if images:
-                        image_url = images[0]['url']
-                        print(f"🎵 Now playing: {track['name']} by {track['artists'][0]['name']}")
-                        
-                        # Download and process image
-                        try:
-                            img_response = requests.get(image_url, timeout=10)
-                            if img_response.status_code == 200:
-                                new_image = Image.open(io.BytesIO(img_response.content))
-                                if new_image.mode != 'RGB':
-                                    new_image = new_image.convert('RGB')
-                                new_image = new_image.resize((MATRIX_SIZE, MATRIX_SIZE), Image.Resampling.LANCZOS)
-                                
-                                # Display with transition if new track
-                                if current_image is None:
-                                    # First image - transition from black
-                                    print("🌊 Loading first track...")
-                                    display_image(matrix, new_image)
-                                elif not is_new_track:
-                                    # Same track - direct display
-                                    display_image(matrix, new_image)
-                                else:
-                                    # New track - soft chaotic transition
-                                    print("🌊 Transitioning to new track...")
-                                    soft_chaotic_transition(matrix, current_image, new_image, duration=1.0)
-                                
-                                current_image = new_image
-                                current_track_id = track_id
-                                
-                        except Exception as e:
-                            print(f"Error processing image: {e}")
-                    else:
-                        print("No album art available")
-                else:
-                    print("No track currently playing")
-            else:
-                print("No track currently playing")
-            
-            time.sleep(0.5)  # Check every 0.5 seconds for faster response
-    else:
+    if response.status_code != 200:
         print(f"❌ Authentication failed: {response.status_code} - {response.text}")
+        return False
+    
+    tokens.update(response.json())
+    print("✅ Successfully authenticated with Spotify!")
+    return True
+
+def main():
+    print("🚀 Simple Spotify Visualizer")
+    print("=" * 40)
+    
+    # Setup matrix
+    matrix = setup_matrix()
+    # MATRIX_DITHER=1 recovers gradient depth lost to pwm_bits = 6
+    output = FrameOutput(matrix, ColorPipeline.from_env(), LAYOUT,
+                         TemporalDither.for_matrix(matrix) if dither_enabled() else None,
+                         instant_on.snapshot)
+    idle = IdleController(output)
+    clock = PlaybackClock()
+    title = setup_overlays(output, clock, MATRIX_SIZE)
+    print("✅ RGB Matrix initialized")
+    
+    # Reuse saved tokens so restarts don't need the browser again
+    tokens = TokenManager(CLIENT_ID)
+    if tokens.load():
+        print("✅ Loaded saved Spotify tokens")
+    elif not authorize(tokens):
+        return
+    
+    # Refresh ahead of expiry in the background
+    tokens.start()
+    http = get_client()
+    
+    # Start the visualizer loop
+    print("🎵 Starting visualizer loop...")
+    detector = TrackChangeDetector()
+    art_cache = ArtCache()
+    scheduler = PollScheduler(idle_grace=IDLE_GRACE)  # slow down only once the panel is asleep
+    prefetcher = Prefetcher(tokens, art_cache, MATRIX_SIZE)
+    prefetcher.start()
+    prewarmer = start_prewarm(tokens, art_cache, MATRIX_SIZE)
+    
+    # /metrics, browser previews and the overlay ticker
+    start_services(output, {
+        'detector': detector.stats, 'art_cache': art_cache.stats, 'poll': scheduler.stats,
+        'http': http.stats, 'token': tokens.stats, 'prefetch': prefetcher.stats,
+        'idle': idle.stats, 'output': output.stats, 'progress': clock.stats,
+        'prewarm': prewarmer and prewarmer.stats,
+    })
+    
+    playback = PlaybackObserver(scheduler, detector, MATRIX_SIZE, idle, clock, prefetcher)
+    while True:
+        headers = tokens.auth_header()
+        # Testing hook: force a 401 occasionally to exercise refresh path
+        if os.environ.get('FORCE_EXPIRE') == '1' and int(time.time()) % 15 == 0:
+            print('⚙️ Forcing token expiry test (injecting invalid token)')
+            headers = {'Authorization': 'Bearer invalid_token'}
+        response = get_currently_playing(http, headers)
+    
+        # If the token was rejected anyway, refresh and retry once
+        if response is not None and response.status_code == 401:
+            print("🔄 Access token rejected. Refreshing...")
+            if tokens.refresh():
+                response = get_currently_playing(http, tokens.auth_header())
+            else:
+                print("❌ Failed to refresh token. Please re-authenticate.")
+                break
+    
+        track_data = playback.observe(response)
+        if track_data:
+            track = track_data['item']
+            album = track.get('album', {})
+            images = album.get('images', [])
+    
+            if images:
+                image_url = pick_image_url(images, MATRIX_SIZE)
+                is_new_track, art_changed = detector.observe(track, image_url)
+                if is_new_track:
+                    print(f"🎵 Now playing: {track['name']} by {track['artists'][0]['name']}")
+                    if title and not art_changed and not idle.asleep:
+                        title.set_track(track)  # same album art stays, so no redraw starts it
+    
+                # Download and process image only when the art changed
+                if art_changed:
+                    # Cached frames skip the download and resize entirely
+                    new_image = load_album_art(art_cache, album.get('id'), image_url, MATRIX_SIZE)
+                    if new_image:
+                        # Held back while idle; transitions start from whatever is lit
+                        if idle.show(new_image, detector.art_key_for(track, image_url), present_art) and title:
+                            title.set_track(track, palette_of(new_image))
+                        detector.art_displayed(track, image_url)
+            else:
+                print("No album art available")
+    
+        time.sleep(scheduler.next_delay())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,62 +5,88 @@ Converts album art to 32x32 RGB LED matrix display
 """
 
 import os
-import sys
-import time
+import instant_on
+
+# Matrix settings (panel geometry comes from MATRIX_*, see panel_layout.py)
+MATRIX_SETTINGS = {
+    'hardware_mapping': 'adafruit-hat',
+    'gpio_slowdown': 4,
+    'brightness': 20,
+}
+
+if __name__ == "__main__":
+    # Light the panel with the last frame before the heavy imports below
+    instant_on.start(MATRIX_SETTINGS)
+
 import base64
 import hashlib
 import secrets
 import webbrowser
 from urllib.parse import urlencode, parse_qs, urlparse
 import requests
-from PIL import Image
-import io
+from track_change import TrackChangeDetector
+from art_cache import ArtCache
+from album_art import load_album_art, pick_image_url
+from frame_output import FrameOutput
+from color import ColorPipeline
+from polling import PollScheduler
+from http_client import get_client, api_url, TOKEN_URL
+from pipeline import VisualizerPipeline, ArtRequest
+from token_store import TokenManager, CLIENT_ID
+from panel_layout import LAYOUT
+from prefetch import Prefetcher
+import metrics
+from frame_stream import FrameStream
+from runtime import PlaybackObserver, setup_overlays, start_prewarm, start_services
+from idle import IdleController, IDLE_GRACE
+from progress_bar import PlaybackClock
+from palette import palette_of
 
-# RGB Matrix imports (will be installed on Pi)
-try:
-    from rgbmatrix import RGBMatrix, RGBMatrixOptions
-    MATRIX_AVAILABLE = True
-except ImportError:
-    print("RGB Matrix library not available - running in simulation mode")
-    MATRIX_AVAILABLE = False
+# RGB Matrix library (will be installed on Pi), simulated otherwise
+MATRIX_AVAILABLE = instant_on.load_matrix_classes()[2]
 
 # Configuration
-CLIENT_ID = 'b245d267eebd4c97a090419d44fbd396'  # Same as your JS version
 REDIRECT_URI = 'http://127.0.0.1:8888'
-SCOPE = 'user-read-currently-playing'
-MATRIX_SIZE = 32
-REFRESH_INTERVAL = 1.0  # seconds
+# Playback state for the queue prefetch, playlists and saved albums for prewarm.py
+SCOPE = 'user-read-currently-playing user-read-playback-state playlist-read-private user-library-read'
+MATRIX_SIZE = LAYOUT.art_size  # square album art, centered on wider layouts
 
 class SpotifyVisualizer:
     def __init__(self):
-        self.access_token = None
-        self.refresh_token = None
+        self.tokens = TokenManager(CLIENT_ID)
         self.matrix = None
+        self.output = None
+        self.detector = TrackChangeDetector()
+        self.art_cache = ArtCache()
+        self.scheduler = PollScheduler(idle_grace=IDLE_GRACE)  # slow down only once the panel is asleep
+        self.http = get_client()
+        self.pipeline = None
+        self.prefetcher = Prefetcher(self.tokens, self.art_cache, MATRIX_SIZE)
+        self.prewarmer = None
+        self.playback = None
+        self.frame_stream = FrameStream()
+        self.idle = None
+        self.clock = PlaybackClock()
+        self.title = None
         self.setup_matrix()
         
     def setup_matrix(self):
         """Initialize the RGB matrix hardware"""
         if not MATRIX_AVAILABLE:
-            print("Running in simulation mode - no physical matrix")
-            return None
+            print("Running in simulation mode - frames go to a simulated matrix")
             
-        try:
-            options = RGBMatrixOptions()
-            options.rows = MATRIX_SIZE
-            options.cols = MATRIX_SIZE
-            options.chain_length = 1
-            options.parallel = 1
-            options.hardware_mapping = 'adafruit-hat'
-            options.gpio_slowdown = 4
-            options.brightness = 20
-            
-            self.matrix = RGBMatrix(options=options)
-            print("RGB Matrix initialized successfully")
-        except Exception as e:
-            print(f"Failed to initialize RGB matrix: {e}")
-            self.matrix = None
-
-
+        # Normally already created (and showing the last frame) by instant_on
+        self.matrix = instant_on.matrix or instant_on.start(MATRIX_SETTINGS)
+        if not self.matrix:
+            self.output = None
+            return
+        self.output = FrameOutput(self.matrix, ColorPipeline.from_env(), LAYOUT,
+                                  snapshot=instant_on.snapshot)
+        self.idle = IdleController(self.output)
+        self.title = setup_overlays(self.output, self.clock, MATRIX_SIZE)
+        self.playback = PlaybackObserver(self.scheduler, self.detector, MATRIX_SIZE, self.idle,
+                                         self.clock, self.prefetcher)
+        print(f"RGB Matrix initialized successfully ({LAYOUT.describe()})")
 
     
     def generate_code_verifier(self, length=64):
@@ -165,16 +191,15 @@ class SpotifyVisualizer:
             'code_verifier': code_verifier
         }
         
-        response = requests.post('https://accounts.spotify.com/api/token', data=data)
+        try:
+            response = self.http.post(TOKEN_URL, data=data)
+        except requests.RequestException as e:
+            print(f"Token exchange failed: {e}")
+            return False
         
         if response.status_code == 200:
-            token_data = response.json()
-            self.access_token = token_data['access_token']
-            self.refresh_token = token_data.get('refresh_token')
-            
-            # Save tokens for future use
-            with open('.tokens', 'w') as f:
-                f.write(f"{self.access_token}\n{self.refresh_token or ''}")
+            # Save tokens (with their expiry) for future use
+            self.tokens.update(response.json())
             
             print("Successfully authenticated with Spotify!")
             return True
@@ -184,96 +209,92 @@ class SpotifyVisualizer:
 
     def load_saved_tokens(self):
         """Load previously saved tokens"""
-        try:
-            with open('.tokens', 'r') as f:
-                lines = f.read().strip().split('\n')
-                if len(lines) >= 1:
-                    self.access_token = lines[0]
-                    if len(lines) >= 2:
-                        self.refresh_token = lines[1]
-                    return True
-        except FileNotFoundError:
-            pass
-        return False
+        return self.tokens.load()
 
     def get_current_track(self):
-        """Get currently playing track from Spotify API"""
-        if not self.access_token:
+        """Poll the currently-playing endpoint; the response, or None if the request failed"""
+        if not self.tokens.access_token:
             return None
             
-        headers = {'Authorization': f'Bearer {self.access_token}'}
-        response = requests.get('https://api.spotify.com/v1/me/player/currently-playing', headers=headers)
+        url = api_url('/v1/me/player/currently-playing')
+        try:
+            with metrics.timer('poll'):
+                response = self.http.get(url, conditional=True, headers=self.tokens.auth_header())
+            if response.status_code == 401 and self.tokens.refresh():
+                # Revoked early - the background refresh normally gets there first
+                with metrics.timer('poll'):
+                    response = self.http.get(url, conditional=True, headers=self.tokens.auth_header())
+        except requests.RequestException as e:
+            print(f"Poll failed: {e}")
+            return None
         
-        if response.status_code == 200:
-            return response.json()
+        if response.status_code == 429:
+            print(f"Rate limited, backing off {response.headers.get('Retry-After', '?')}s")
         elif response.status_code == 401:
-            print("Token expired, need to re-authenticate")
+            print("Token rejected and refresh failed, need to re-authenticate")
+        return response
+
+    def poll_once(self):
+        """Poller stage: return the ArtRequest for what should be on screen"""
+        track_data = self.playback.observe(self.get_current_track())
+        if not track_data:
             return None
-        else:
+        
+        track = track_data['item']
+        album = track.get('album', {})
+        images = album.get('images', [])
+        image_url = pick_image_url(images, MATRIX_SIZE)  # Smallest variant that covers the matrix
+        
+        track_changed, art_changed = self.detector.observe(track, image_url)
+        if track_changed:
+            print(f"Now playing: {track['name']} by {track['artists'][0]['name']}")
+            if self.title and not art_changed and not (self.idle and self.idle.asleep):
+                self.title.set_track(track)  # same album art stays, so no redraw starts it
+            if not images:
+                print("No album art available")
+        if not images:
             return None
-
-    def download_and_process_image(self, image_url):
-        """Download album art and process it for the LED matrix"""
-        try:
-            response = requests.get(image_url, timeout=10)
-            if response.status_code == 200:
-                # Open image with PIL
-                image = Image.open(io.BytesIO(response.content))
-                
-                # Convert to RGB if needed
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                
-                # Resize to matrix size
-                image = image.resize((MATRIX_SIZE, MATRIX_SIZE), Image.Resampling.LANCZOS)
-                
-                return image
-        except Exception as e:
-            print(f"Error processing image: {e}")
         
-        return None
+        key = self.detector.art_key_for(track, image_url)
+        return ArtRequest(key, album.get('id'), image_url, track)
+
+    def load_art(self, request):
+        """Worker stage: download and process the art (cache first)"""
+        image = self.download_and_process_image(request.image_url, request.album_id)
+        if image is None:
+            print("Failed to process album art")
+        return image
+
+    def present_art(self, request, image):
+        """Render stage: the only place that touches the matrix"""
+        if self.display_image_on_matrix(image, request.key) and self.title:
+            self.title.set_track(request.track, palette_of(image))
+        self.detector.art_displayed(request.track, request.image_url)
+
+    def download_and_process_image(self, image_url, album_id=None):
+        """Get album art processed for the LED matrix, from cache when possible"""
+        return load_album_art(self.art_cache, album_id, image_url, MATRIX_SIZE)
 
-    def display_image_on_matrix(self, image):
+    def display_image_on_matrix(self, image, key=None):
         """Display the processed image on the RGB matrix"""
-        if not self.matrix:
-            # Simulation mode - print to console
-            self.simulate_matrix_display(image)
+        if not self.output:
             return
             
         try:
-            # Convert PIL image to RGB matrix format
-            for y in range(MATRIX_SIZE):
-                for x in range(MATRIX_SIZE):
-                    r, g, b = image.getpixel((x, y))
-                    self.matrix.SetPixel(x, y, r, g, b)
+            # Blit the whole frame offscreen and swap it in on vsync (held back while idle)
+            return self.idle.show(image, key)
         except Exception as e:
             print(f"Error displaying on matrix: {e}")
 
-    def simulate_matrix_display(self, image):
-        """Simulate matrix display in console (for testing without hardware)"""
-        print("\n" + "="*50)
-        print("LED MATRIX SIMULATION (32x32)")
-        print("="*50)
-        
-        # Create a simple ASCII representation
-        for y in range(0, MATRIX_SIZE, 2):  # Skip every other row for readability
-            row = ""
-            for x in range(MATRIX_SIZE):
-                r, g, b = image.getpixel((x, y))
-                # Convert RGB to grayscale and choose character
-                gray = int(0.299*r + 0.587*g + 0.114*b)
-                if gray > 200:
-                    row += "█"
-                elif gray > 150:
-                    row += "▓"
-                elif gray > 100:
-                    row += "▒"
-                elif gray > 50:
-                    row += "░"
-                else:
-                    row += " "
-            print(row)
-        print("="*50)
+    def component_stats(self):
+        """The component stats dicts to export on /metrics"""
+        return {
+            'detector': self.detector.stats, 'art_cache': self.art_cache.stats, 'poll': self.scheduler.stats,
+            'http': self.http.stats, 'token': self.tokens.stats, 'prefetch': self.prefetcher.stats,
+            'pipeline': self.pipeline and self.pipeline.stats, 'idle': self.idle and self.idle.stats,
+            'output': self.output and self.output.stats, 'progress': self.clock.stats,
+            'prewarm': self.prewarmer and self.prewarmer.stats,
+        }
 
     def run_visualizer(self):
         """Main visualizer loop"""
@@ -312,39 +333,36 @@ class SpotifyVisualizer:
                 print("❌ Token exchange failed!")
                 return
         
+        # Keep the access token fresh off the hot path
+        self.tokens.start()
+        self.prefetcher.start()
+        self.prewarmer = start_prewarm(self.tokens, self.art_cache, MATRIX_SIZE)
+        
         print("Starting visualizer loop...")
         print("Press Ctrl+C to stop")
         
+        # Poll, art loading and rendering each run on their own thread
+        self.pipeline = VisualizerPipeline(self.poll_once, self.scheduler.next_delay,
+                                           self.load_art, self.present_art)
+        if self.idle:
+            self.idle.defer = self.pipeline.call_on_render  # fades are drawing too
+        # /metrics, browser previews and the overlay ticker
+        start_services(self.output, self.component_stats(), self.frame_stream, self.pipeline)
         try:
-            while True:
-                track_data = self.get_current_track()
-                
-                if track_data and track_data.get('item'):
-                    track = track_data['item']
-                    album = track.get('album', {})
-                    images = album.get('images', [])
-                    
-                    if images:
-                        image_url = images[0]['url']  # Get highest resolution image
-                        print(f"Now playing: {track['name']} by {track['artists'][0]['name']}")
-                        
-                        # Process and display image
-                        processed_image = self.download_and_process_image(image_url)
-                        if processed_image:
-                            self.display_image_on_matrix(processed_image)
-                        else:
-                            print("Failed to process album art")
-                    else:
-                        print("No album art available")
-                else:
-                    print("No track currently playing")
-                
-                time.sleep(REFRESH_INTERVAL)
-                
+            self.pipeline.run_forever()
         except KeyboardInterrupt:
             print("\nVisualizer stopped by user")
         except Exception as e:
             print(f"Error in visualizer loop: {e}")
+        finally:
+            print(f"Work skipped: {self.detector.summary()}")
+            print(f"Polls: {self.scheduler.stats['polls']}, rate limited: {self.scheduler.stats['rate_limited']}")
+            print(f"Art cache: {self.art_cache.summary()}")
+            print(f"Prefetched: {self.prefetcher.stats['prefetched']} of {self.prefetcher.stats['queue_lookups']} queue lookups")
+            if self.pipeline:
+                print(f"Pipeline: {self.pipeline.summary()}")
+            if self.idle:
+                print(f"Idle: {self.idle.summary()}")
 
 def main():
     visualizer = SpotifyVisualizer()
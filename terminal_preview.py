@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Truecolor terminal preview of the simulated matrix
+Two pixel rows per text row using the upper half block (foreground = top
+pixel, background = bottom pixel). The first frame is drawn in full, after
+that only changed cells are rewritten with cursor-addressed updates
+"""
+
+import os
+import sys
+import threading
+
+# Configuration
+PREVIEW = os.environ.get('SIM_PREVIEW', 'auto')  # auto = only on a terminal, 1 = always, 0 = never
+
+UPPER_HALF = '▀'
+ESC = '\x1b['
+
+
+def preview_enabled(stream=None, mode=PREVIEW):
+    """Whether to draw the preview (never into a log file or the journal by default)"""
+    if mode == '0':
+        return False
+    if mode == '1':
+        return True
+    stream = stream or sys.stdout
+    return hasattr(stream, 'isatty') and stream.isatty() and os.environ.get('TERM') != 'dumb'
+
+
+class TerminalPreview:
+    """Renders raw RGB frames as a fixed block at the top of the terminal"""
+
+    def __init__(self, width, height, stream=None):
+        self.width = width
+        self.height = height
+        self.rows = (height + 1) // 2
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+        self.cells = None  # last drawn (top, bottom) byte pairs per text row
+        self.stats = {'frames': 0, 'cells': 0, 'bytes': 0}
+
+    def _row_pixels(self, pixels, y):
+        stride = self.width * 3
+        if y >= self.height:
+            return bytes(stride)  # odd height: pad the last bottom row with black
+        return pixels[y * stride:(y + 1) * stride]
+
+    def _begin(self):
+        """Clear the screen and keep log output scrolling below the preview"""
+        return f'{ESC}2J{ESC}{self.rows + 2};r{ESC}{self.rows + 2};1H'
+
+    def render(self, pixels):
+        """Draw a frame given as raw RGB bytes (width * height * 3)"""
+        with self.lock:
+            first = self.cells is None
+            previous = self.cells or [None] * self.rows
+            cells = []
+            out = [self._begin()] if first else []
+            out.append('\x1b7')  # save the log cursor
+            fg = bg = None
+            changed = 0
+
+            for row in range(self.rows):
+                top = self._row_pixels(pixels, row * 2)
+                bottom = self._row_pixels(pixels, row * 2 + 1)
+                cells.append((top, bottom))
+                old = previous[row]
+                if old == (top, bottom):
+                    continue  # whole text row unchanged
+
+                cursor = None
+                for x in range(self.width):
+                    i = x * 3
+                    t = top[i:i + 3]
+                    b = bottom[i:i + 3]
+                    if old is not None and old[0][i:i + 3] == t and old[1][i:i + 3] == b:
+                        continue
+                    if cursor != x:
+                        out.append(f'{ESC}{row + 1};{x + 1}H')
+                    if t != fg:
+                        out.append(f'{ESC}38;2;{t[0]};{t[1]};{t[2]}m')
+                        fg = t
+                    if b != bg:
+                        out.append(f'{ESC}48;2;{b[0]};{b[1]};{b[2]}m')
+                        bg = b
+                    out.append(UPPER_HALF)
+                    cursor = x + 1
+                    changed += 1
+
+            self.cells = cells
+            if not changed and not first:
+                return
+            out.append(f'{ESC}0m\x1b8')  # reset colors, back to the log cursor
+            text = ''.join(out)
+            try:
+                self.stream.write(text)
+                self.stream.flush()
+            except (OSError, ValueError):
+                return
+            self.stats['frames'] += 1
+            self.stats['cells'] += changed
+            self.stats['bytes'] += len(text.encode('utf-8'))
+
+    def close(self):
+        """Give the whole terminal back to normal output"""
+        with self.lock:
+            if self.cells is None:
+                return
+            try:
+                self.stream.write(f'{ESC}0m{ESC}r{ESC}{self.rows + 2};1H\n')
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+            self.cells = None
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Bitmap text for the matrix: glyph atlas, cached strips and marquee scrolling
+The 5x7 font is stored column-packed (one byte per glyph column, bit 0 at
+the top) and unpacked once into a glyph atlas. A string is rendered into a
+strip once and cached, so scrolling only moves a window along the strip and
+each frame is a slice rather than a re-render
+"""
+
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from palette import readable
+
+# Configuration
+TRACK_TITLE = os.environ.get('TRACK_TITLE', '1') == '1'  # scroll "name - artist" over new art
+SCROLL_SPEED = float(os.environ.get('SCROLL_SPEED', '20'))  # pixels per second
+TITLE_PALETTE = os.environ.get('TITLE_PALETTE', '1') == '1'  # title in the art's accent color
+TITLE_HOLD = 1.0      # seconds the start of the title stands still before scrolling
+TEXT_CACHE_SIZE = 32  # rendered strips kept in memory
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7
+SPACING = 1           # blank columns after each glyph
+
+# Printable ASCII 0x20-0x7E, GLYPH_WIDTH column bytes per glyph
+FONT_5X7 = bytes.fromhex(
+    '0000000000' '00005f0000' '0007000700' '147f147f14' '242a7f2a12'  # space ! " # $
+    '2313086462' '3649552250' '0005030000' '001c224100' '0041221c00'  # % & ' ( )
+    '082a1c2a08' '08083e0808' '0050300000' '0808080808' '0060600000'  # * + , - .
+    '2010080402' '3e5149453e' '00427f4000' '4261514946' '2141454b31'  # / 0 1 2 3
+    '1814127f10' '2745454539' '3c4a494930' '0171090503' '3649494936'  # 4 5 6 7 8
+    '064949291e' '0036360000' '0056360000' '0814224100' '1414141414'  # 9 : ; < =
+    '0041221408' '0201510906' '324979413e' '7e1111117e' '7f49494936'  # > ? @ A B
+    '3e41414122' '7f4141221c' '7f49494941' '7f09090101' '3e41415132'  # C D E F G
+    '7f0808087f' '00417f4100' '2040413f01' '7f08142241' '7f40404040'  # H I J K L
+    '7f0204027f' '7f0408107f' '3e4141413e' '7f09090906' '3e4151215e'  # M N O P Q
+    '7f09192946' '4649494931' '01017f0101' '3f4040403f' '1f2040201f'  # R S T U V
+    '7f2018207f' '6314081463' '0304780403' '6151494543' '007f414100'  # W X Y Z [
+    '0204081020' '0041417f00' '0402010204' '4040404040' '0001020400'  # \ ] ^ _ `
+    '2054545478' '7f48444438' '3844444420' '384444487f' '3854545418'  # a b c d e
+    '087e090102' '0c5252523e' '7f08040478' '00447d4000' '2040443d00'  # f g h i j
+    '007f102844' '00417f4000' '7c04180478' '7c08040478' '3844444438'  # k l m n o
+    '7c14141408' '081414187c' '7c08040408' '4854545420' '043f444020'  # p q r s t
+    '3c4040207c' '1c2040201c' '3c4030403c' '4428102844' '0c5050503c'  # u v w x y
+    '4464544c44' '0008364100' '00007f0000' '0041360800' '1008081008'  # z { | } ~
+)
+FIRST_CHAR = 0x20
+FALLBACK = '?'
+# Typographic punctuation common in track names
+PUNCTUATION = str.maketrans({'\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+                             '\u2013': '-', '\u2014': '-', '\u2026': '...', '\u00d7': 'x'})
+
+
+class GlyphAtlas:
+    """Every glyph unpacked once into a (glyphs, height, width) 0/1 array"""
+
+    def __init__(self, packed=FONT_5X7, width=GLYPH_WIDTH, height=GLYPH_HEIGHT, spacing=SPACING):
+        self.width = width
+        self.height = height
+        self.spacing = spacing
+        columns = np.frombuffer(packed, dtype=np.uint8).reshape(-1, width)
+        # Column bytes -> bit rows (bit 0 is the top row), then rows x columns
+        bits = np.unpackbits(columns[:, :, None], axis=2, bitorder='little')[:, :, :height]
+        glyphs = bits.transpose(0, 2, 1)
+        # Trailing blank columns are part of each glyph's advance
+        self.glyphs = np.pad(glyphs, ((0, 0), (0, 0), (0, spacing)))
+        self.count = len(glyphs)
+
+    def index(self, char):
+        code = ord(char) - FIRST_CHAR
+        if 0 <= code < self.count:
+            return code
+        return ord(FALLBACK) - FIRST_CHAR
+
+    def render(self, text):
+        """(height, width) 0/1 mask of text; one gather over the atlas"""
+        if not text:
+            return np.zeros((self.height, 0), dtype=np.uint8)
+        indices = [self.index(char) for char in text]
+        strip = self.glyphs[indices].transpose(1, 0, 2).reshape(self.height, -1)
+        return strip[:, :strip.shape[1] - self.spacing]
+
+
+def to_ascii(text):
+    """Closest ASCII spelling the font can show (Beyoncé -> Beyonce)"""
+    decomposed = unicodedata.normalize('NFKD', text.translate(PUNCTUATION))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+_atlas = None
+_strips = OrderedDict()  # text -> rendered mask
+
+
+def get_atlas():
+    """The process-wide atlas, built on first use"""
+    global _atlas
+    if _atlas is None:
+        _atlas = GlyphAtlas()
+    return _atlas
+
+
+def render_text(text):
+    """Rendered mask for text, cached so each track title is drawn once"""
+    text = to_ascii(text)
+    mask = _strips.get(text)
+    if mask is not None:
+        _strips.move_to_end(text)
+        return mask
+    mask = get_atlas().render(text)
+    mask.flags.writeable = False
+    _strips[text] = mask
+    while len(_strips) > TEXT_CACHE_SIZE:
+        _strips.popitem(last=False)
+    return mask
+
+
+class Marquee:
+    """A fixed-width window onto a rendered strip, scrolled by slicing"""
+
+    def __init__(self, text, width, color=(255, 255, 255), speed=SCROLL_SPEED, gap=None):
+        self.width = width
+        self.speed = speed
+        mask = render_text(text)
+        self.height = mask.shape[0]
+        self.scrolls = mask.shape[1] > width
+        if self.scrolls:
+            # Strip, gap, then the strip's start again so any window is one slice
+            gap = width // 2 if gap is None else gap
+            self.period = mask.shape[1] + gap
+            loop = np.zeros((self.height, self.period + width), dtype=np.uint8)
+            loop[:, :mask.shape[1]] = mask
+            loop[:, self.period:] = loop[:, :width]
+        else:
+            # Fits: centered, never moves
+            self.period = 0
+            loop = np.zeros((self.height, width), dtype=np.uint8)
+            left = (width - mask.shape[1]) // 2
+            loop[:, left:left + mask.shape[1]] = mask
+        self.mask = loop
+        self.rgb = loop[:, :, None] * np.array(color, dtype=np.uint8)
+
+    def offset(self, elapsed):
+        if not self.scrolls:
+            return 0
+        return int(max(0.0, elapsed) * self.speed) % self.period
+
+    def window(self, elapsed):
+        """(height, width) mask visible after elapsed seconds"""
+        offset = self.offset(elapsed)
+        return self.mask[:, offset:offset + self.width]
+
+    def image(self, elapsed):
+        """RGB image of the visible window"""
+        offset = self.offset(elapsed)
+        return Image.fromarray(np.ascontiguousarray(self.rgb[:, offset:offset + self.width]), 'RGB')
+
+
+class TrackTitle:
+    """FrameOutput overlay: scrolls "name - artist" once across a band over new art"""
+
+    def __init__(self, x, y, width, color=(255, 255, 255), shade=160, speed=SCROLL_SPEED,
+                 use_palette=TITLE_PALETTE):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.color = color
+        self.speed = speed
+        self.use_palette = use_palette
+        self.palette = None  # of the art under the title
+        self.marquee = None
+        self.text_color = color
+        self.started = 0.0
+        # Darkened band behind the text so it reads on bright art
+        band_height = get_atlas().height + 2
+        self.band = {(x + i, y + j): (0, 0, 0, shade) for j in range(band_height) for i in range(width)}
+
+    @classmethod
+    def over_art(cls, frame_width, frame_height, art_size, **kwargs):
+        """Band along the top of art centered on the frame"""
+        return cls((frame_width - art_size) // 2, (frame_height - art_size) // 2, art_size, **kwargs)
+
+    def set_track(self, track, palette=None):
+        """Start scrolling the title of track (as shown on the matrix)
+
+        palette is that of the art just shown; None keeps the previous one,
+        for a new track on the same album.
+        """
+        if palette is not None:
+            self.palette = palette
+        artists = ', '.join(artist['name'] for artist in track.get('artists', [])[:2])
+        title = f"{track.get('name', '')} - {artists}" if artists else track.get('name', '')
+        if self.use_palette and self.palette:
+            self.text_color = readable(self.palette.accent)
+        else:
+            self.text_color = self.color
+        self.marquee = Marquee(title, self.width, self.text_color, self.speed)
+        self.started = time.monotonic()
+
+    def pixels(self):
+        marquee = self.marquee
+        if marquee is None:
+            return {}
+        elapsed = time.monotonic() - self.started - TITLE_HOLD
+        duration = marquee.period / self.speed if marquee.scrolls else 2 * TITLE_HOLD
+        if elapsed >= duration:
+            self.marquee = None  # one pass, then the art is left alone
+            return {}
+        pixels = dict(self.band)
+        r, g, b = self.text_color
+        rows, cols = np.nonzero(marquee.window(elapsed))
+        top = self.y + 1
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            pixels[(self.x + col, top + row)] = (r, g, b, 255)
+        return pixels
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Spotify token management shared by all visualizer runtimes
+Persists access token, refresh token and absolute expiry atomically and
+refreshes in the background before expiry, so polls never hit a stale token
+"""
+
+import os
+import json
+import time
+import threading
+import requests
+from http_client import get_client, TOKEN_URL
+import metrics
+
+# Configuration
+# The Spotify app every runtime and prewarm.py authorize as (the same one as script.js)
+CLIENT_ID = os.environ.get('SPOTIFY_CLIENT_ID', 'b245d267eebd4c97a090419d44fbd396')
+TOKENS_FILE = os.environ.get('SPOTIFY_TOKENS_FILE', '.tokens')
+REFRESH_MARGIN = 300      # refresh this many seconds before expiry
+RETRY_INTERVAL = 15       # first retry after a failed background refresh
+RETRY_MAX_INTERVAL = 300
+
+
+class TokenManager:
+    """Owns the Spotify tokens for one client id"""
+
+    def __init__(self, client_id, path=TOKENS_FILE, refresh_margin=REFRESH_MARGIN):
+        self.client_id = client_id
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = 0.0  # wall-clock seconds, 0 = unknown
+        self.lock = threading.RLock()
+        self.refresh_lock = threading.Lock()  # one refresh request at a time
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.stats = {'refreshes': 0, 'refresh_failures': 0}
+
+    def load(self):
+        """Load saved tokens, accepting the old two-line .tokens format"""
+        try:
+            with open(self.path, 'r') as f:
+                raw = f.read().strip()
+        except FileNotFoundError:
+            return False
+
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            # Legacy format: access token, then refresh token, expiry unknown
+            lines = raw.split('\n')
+            data = {
+                'access_token': lines[0],
+                'refresh_token': lines[1] if len(lines) >= 2 else None,
+                'expires_at': 0,
+            }
+
+        with self.lock:
+            self.access_token = data.get('access_token') or None
+            self.refresh_token = data.get('refresh_token') or None
+            self.expires_at = float(data.get('expires_at') or 0)
+        return self.access_token is not None
+
+    def save(self):
+        """Write tokens atomically: temp file, fsync, then rename over the old one"""
+        with self.lock:
+            data = {
+                'access_token': self.access_token,
+                'refresh_token': self.refresh_token,
+                'expires_at': self.expires_at,
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save tokens: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def update(self, token_data):
+        """Store a token endpoint response (exchange or refresh) and persist it"""
+        with self.lock:
+            self.access_token = token_data['access_token']
+            # Refreshes don't always return a new refresh token
+            if token_data.get('refresh_token'):
+                self.refresh_token = token_data['refresh_token']
+            expires_in = token_data.get('expires_in')
+            self.expires_at = time.time() + float(expires_in) if expires_in else 0.0
+        self.save()
+        self.wakeup.set()  # reschedule the background refresh
+
+    def seconds_left(self):
+        """Seconds until the access token expires (None if unknown)"""
+        with self.lock:
+            if not self.expires_at:
+                return None
+            return self.expires_at - time.time()
+
+    def needs_refresh(self):
+        left = self.seconds_left()
+        return left is None or left <= self.refresh_margin
+
+    def refresh(self):
+        """Refresh the access token now; returns True on success
+
+        Serialized: the background loop and a 401 retry can both ask at
+        once, and with rotating refresh tokens the second POST of the same
+        refresh token would fail. Whoever waited reuses the first result.
+        """
+        with self.lock:
+            seen = self.access_token
+        with self.refresh_lock:
+            with self.lock:
+                if self.access_token != seen:
+                    return True  # renewed by another thread while this one waited
+                refresh_token = self.refresh_token
+            if not refresh_token:
+                return False
+            return self._refresh(refresh_token)
+
+    def _refresh(self, refresh_token):
+        data = {
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+            'client_id': self.client_id,
+        }
+        try:
+            with metrics.timer('token_refresh'):
+                response = get_client().post(TOKEN_URL, data=data)
+        except requests.RequestException as e:
+            print(f"Token refresh failed: {e}")
+            self.stats['refresh_failures'] += 1
+            return False
+
+        if response.status_code != 200:
+            print(f"Token refresh failed: {response.status_code} - {response.text}")
+            self.stats['refresh_failures'] += 1
+            return False
+
+        self.update(response.json())
+        self.stats['refreshes'] += 1
+        return True
+
+    def auth_header(self):
+        """Authorization header for the current access token"""
+        with self.lock:
+            return {'Authorization': f'Bearer {self.access_token}'}
+
+    def start(self):
+        """Refresh in the background shortly before each expiry"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._refresh_loop, name='token-refresh', daemon=True)
+            self.thread.start()
+
+    def _refresh_loop(self):
+        retry = RETRY_INTERVAL
+        while True:
+            if self.refresh_token and self.needs_refresh():
+                if self.refresh():
+                    retry = RETRY_INTERVAL
+                else:
+                    self.wakeup.wait(retry)
+                    self.wakeup.clear()
+                    retry = min(retry * 2, RETRY_MAX_INTERVAL)
+                    continue
+
+            left = self.seconds_left()
+            delay = RETRY_MAX_INTERVAL if left is None else max(1.0, left - self.refresh_margin)
+            self.wakeup.wait(delay)
+            self.wakeup.clear()
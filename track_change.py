@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Track change detection for the visualizer loops
+Decides whether a poll result needs new album art or can be skipped
+"""
+
+
+class TrackChangeDetector:
+    """Remembers what is on the matrix and counts the work it lets us skip"""
+
+    def __init__(self):
+        self.track_id = None
+        self.art_key = None
+        self.stats = {
+            'polls': 0,
+            'track_changes': 0,
+            'art_changes': 0,
+            'skipped_downloads': 0,
+            'skipped_redraws': 0,
+        }
+
+    @staticmethod
+    def art_key_for(track, image_url):
+        """Build the key that identifies the art for a track"""
+        album_id = track.get('album', {}).get('id')
+        return (album_id, image_url)
+
+    def observe(self, track, image_url):
+        """Record a poll result and return (track_changed, art_changed)"""
+        self.stats['polls'] += 1
+
+        track_id = track.get('id')
+        track_changed = track_id != self.track_id
+        if track_changed:
+            self.track_id = track_id
+            self.stats['track_changes'] += 1
+
+        art_changed = self.art_key_for(track, image_url) != self.art_key
+        if art_changed:
+            self.stats['art_changes'] += 1
+        else:
+            # Same art already on the matrix - no download, decode or redraw
+            self.stats['skipped_downloads'] += 1
+            self.stats['skipped_redraws'] += 1
+
+        return track_changed, art_changed
+
+    def art_displayed(self, track, image_url):
+        """Mark the art for a track as successfully shown on the matrix"""
+        self.art_key = self.art_key_for(track, image_url)
+
+    def no_track(self):
+        """Forget the current track (nothing playing) but keep the displayed art"""
+        self.track_id = None
+
+    def reset(self):
+        """Forget everything so the next poll redraws"""
+        self.track_id = None
+        self.art_key = None
+
+    def summary(self):
+        """Human readable summary of the skipped work"""
+        s = self.stats
+        return (f"{s['polls']} polls, {s['track_changes']} track changes, "
+                f"{s['art_changes']} art changes, "
+                f"{s['skipped_downloads']} downloads skipped, "
+                f"{s['skipped_redraws']} redraws skipped")
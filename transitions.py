@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Frame-based transitions between two album art frames
+Each transition is precomputed as a short list of full frames built from
+whole-image masks, then presented at a fixed frame rate
+"""
+
+import time
+import random
+from PIL import Image
+
+TRANSITION_FPS = 30
+
+
+def _threshold_frames(old, new, order_mask, steps, ease=1.0):
+    """Reveal new over old wherever the order mask is below a rising threshold"""
+    frames = []
+    for i in range(1, steps + 1):
+        progress = (i / steps) ** ease
+        threshold = int(round(progress * 256))
+        mask = order_mask.point(lambda v: 255 if v < threshold else 0)
+        frames.append(Image.composite(new, old, mask))
+    return frames
+
+
+def dissolve_frames(old, new, steps, seed=None):
+    """Random pixel dissolve - starts slow and speeds up"""
+    width, height = new.size
+    count = width * height
+    order = list(range(count))
+    random.Random(seed).shuffle(order)
+    order_mask = Image.new('L', new.size)
+    order_mask.putdata([rank * 256 // count for rank in order])
+    return _threshold_frames(old, new, order_mask, steps, ease=1.5)
+
+
+def crossfade_frames(old, new, steps):
+    """Linear blend from old to new"""
+    return [Image.blend(old, new, i / steps) for i in range(1, steps + 1)]
+
+
+def wipe_frames(old, new, steps):
+    """Left to right wipe"""
+    width, height = new.size
+    column = Image.new('L', (width, 1))
+    column.putdata([x * 256 // width for x in range(width)])
+    order_mask = column.resize(new.size, Image.Resampling.NEAREST)
+    return _threshold_frames(old, new, order_mask, steps)
+
+
+TRANSITIONS = {
+    'dissolve': dissolve_frames,
+    'crossfade': crossfade_frames,
+    'wipe': wipe_frames,
+}
+
+
+def build_transition(old, new, style='dissolve', duration=1.0, fps=TRANSITION_FPS):
+    """Precompute the frames of a transition from old to new (old may be None)"""
+    if new.mode != 'RGB':
+        new = new.convert('RGB')
+    if old is None:
+        old = Image.new('RGB', new.size)
+    elif old.mode != 'RGB' or old.size != new.size:
+        old = old.convert('RGB').resize(new.size)
+
+    steps = max(1, int(round(duration * fps)))
+    try:
+        make_frames = TRANSITIONS[style]
+    except KeyError:
+        raise ValueError(f"Unknown transition style: {style}")
+    return make_frames(old, new, steps)
+
+
+def play_frames(output, frames, fps=TRANSITION_FPS):
+    """Present frames on a fixed schedule so the duration doesn't drift"""
+    interval = 1.0 / fps
+    start = time.monotonic()
+    for i, frame in enumerate(frames):
+        output.show(frame)
+        # Sleep to the absolute deadline of the next frame, not a relative delay
+        delay = start + (i + 1) * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run_transition(output, old, new, style='dissolve', duration=1.0, fps=TRANSITION_FPS):
+    """Build and play a transition, ending with new on the matrix"""
+    frames = build_transition(old, new, style, duration, fps)
+    play_frames(output, frames, fps)